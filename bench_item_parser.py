@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark of parse + normalize throughput per API page.
+
+Builds synthetic search pages shaped like TikTok's item_list payloads (with the
+bulky fields we ignore: stats, music, challenges, textExtra...) and times the
+legacy path (bytes -> str -> json.loads -> inline dicts) against item_parser
+with the stdlib backend and with orjson, when installed. The gain comes from
+orjson: the stdlib backend is no faster than the legacy path.
+
+Usage:
+    python bench_item_parser.py --pages 200 --items 30
+"""
+import json
+import time
+import random
+import argparse
+
+import item_parser
+from item_parser import normalize_item
+
+
+def synthetic_item(i: int, rng: random.Random) -> dict:
+    author_id = f"user_{rng.randrange(10**6)}"
+    return {
+            "id": str(7300000000000000000 + i),
+            "desc": " ".join(rng.choice(["銀行", "bank", "客服", "投資", "免費", "#理財", "line", "加入"]) for _ in range(rng.randint(5, 25))),
+            "createTime": 1700000000 + i,
+            "video": {"id": str(i), "height": 1024, "width": 576, "duration": rng.randint(5, 180), "ratio": "720p",
+                      "cover": f"https://p16-sign.tiktokcdn.com/obj/{i}.jpeg", "originCover": f"https://p16-sign.tiktokcdn.com/origin/{i}.jpeg",
+                      "playAddr": f"https://v16-webapp.tiktok.com/{i}/play.mp4", "downloadAddr": f"https://v16-webapp.tiktok.com/{i}/dl.mp4",
+                      "bitrateInfo": [{"Bitrate": 1000000 + j, "QualityType": j, "PlayAddr": {"UrlList": [f"https://v{j}.tiktok.com/{i}.mp4"] * 3}} for j in range(3)]},
+            "author": {"id": str(rng.randrange(10**18)), "uniqueId": author_id, "nickname": f"暱稱 {author_id}",
+                       "signature": "官方客服 line: abc123 " * rng.randint(0, 3), "verified": False, "secUid": "MS4wLjABAAAA" + "x" * 60,
+                       "avatarLarger": f"https://p16.tiktokcdn.com/{author_id}_1080.jpeg", "avatarMedium": f"https://p16.tiktokcdn.com/{author_id}_720.jpeg",
+                       "avatarThumb": f"https://p16.tiktokcdn.com/{author_id}_100.jpeg"},
+            "music": {"id": str(i), "title": "original sound", "playUrl": f"https://sf16.tiktokcdn.com/{i}.mp3", "authorName": author_id, "duration": 30},
+            "challenges": [{"id": str(j), "title": f"tag{j}", "desc": "", "coverLarger": ""} for j in range(rng.randint(0, 4))],
+            "stats": {"diggCount": rng.randrange(10**5), "shareCount": rng.randrange(10**3), "commentCount": rng.randrange(10**3), "playCount": rng.randrange(10**6)},
+            "textExtra": [{"hashtagName": f"tag{j}", "start": j, "end": j + 4, "type": 1} for j in range(rng.randint(0, 4))],
+            }
+
+
+def synthetic_page(n_items: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    page = {"item_list": [synthetic_item(seed * 1000 + i, rng) for i in range(n_items)], "has_more": 1, "cursor": n_items, "extra": {"now": 1700000000000}}
+    return json.dumps(page, ensure_ascii=False).encode("utf-8")
+
+
+def legacy_parse(raw: bytes) -> list:
+    """The pre-item_parser path, as it was inlined in every get_* method."""
+    response_json = json.loads(raw.decode("utf-8"))
+    videos = []
+    for item in response_json.get("item_list", []):
+        video_id = item["id"]
+        author_id = item["author"]["uniqueId"]
+        videos.append({
+                        "video": {
+                                    "id": video_id,
+                                    "desc": item["desc"],
+                                    "create_time": item["createTime"],
+                                    "share_link": f"https://www.tiktok.com/@{author_id}/video/{video_id}",
+                                    "cover_img_url": item["video"].get("cover", ""),
+                                    "download_url": item["video"].get("downloadAddr") or item["video"].get("playAddr", "")
+                                },
+                        "author": {
+                                    "id": author_id,
+                                    "nickname": item["author"]["nickname"],
+                                    "signature": item["author"]["signature"],
+                                    "icon_img_url_L": item["author"].get("avatarLarger", ""),
+                                    "icon_img_url_M": item["author"].get("avatarMedium", ""),
+                                    "icon_img_url_S": item["author"].get("avatarThumb", "")
+                                }
+                    })
+    return videos
+
+
+def parser_with(loads):
+    def parse(raw: bytes) -> list:
+        response_json = loads(raw)
+        return [normalize_item(item) for item in response_json.get("item_list", [])]
+    return parse
+
+
+def bench(name: str, parse, pages: list, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        n_items = sum(len(parse(raw)) for raw in pages)
+        best = min(best, time.perf_counter() - start)
+    mb = sum(map(len, pages)) / 1e6
+    print(f"{name:<22} {len(pages) / best:>9.0f} pages/s {n_items / best:>10.0f} items/s {mb / best:>8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark TikTok item parsing + normalization.")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--items", type=int, default=30, help="Items per page")
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N runs")
+    args = parser.parse_args()
+
+    pages = [synthetic_page(args.items, seed) for seed in range(args.pages)]
+    print(f"{args.pages} pages x {args.items} items, {sum(map(len, pages)) / len(pages) / 1024:.1f} KB/page, item_parser backend: {item_parser.JSON_BACKEND}")
+    as_legacy = lambda video: {"video": {key: value for key, value in video._asdict().items() if key != "author"}, "author": video.author._asdict()}
+    assert legacy_parse(pages[0]) == [as_legacy(video) for video in parser_with(json.loads)(pages[0])], "normalizer output differs from the legacy path"
+    bench("legacy (decode+json)", legacy_parse, pages, args.repeat)
+    bench("item_parser json", parser_with(json.loads), pages, args.repeat)
+    try:
+        import orjson
+        bench("item_parser orjson", parser_with(orjson.loads), pages, args.repeat)
+    except ImportError:
+        print("orjson not installed")
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the record types against the nested dicts they replaced.
+
+Over N synthetic search results, measures the memory held by the results
+(tracemalloc), the filter loop's attribute access, and building the kept
+report rows, for {"video": {...}, "author": {...}} dicts + row dicts versus
+Video/Author + ReportRow records.
+
+Usage:
+    python bench_records.py --items 100000
+"""
+import time
+import random
+import argparse
+import tracemalloc
+
+from records import Author, Video, ReportRow
+
+
+def make_fields(n: int, seed=0) -> list:
+    rng = random.Random(seed)
+    fields = []
+    for i in range(n):
+        author_id = f"user_{rng.randrange(10**6)}"
+        video_id = str(7300000000000000000 + i)
+        fields.append((video_id, f"desc {i} " * rng.randint(1, 5), 1700000000 + i, f"https://www.tiktok.com/@{author_id}/video/{video_id}",
+                       f"https://p16.tiktokcdn.com/{i}.jpeg", f"https://v16.tiktok.com/{i}.mp4",
+                       author_id, f"nick {author_id}", "signature", f"https://p16.tiktokcdn.com/{author_id}_1080.jpeg"))
+    return fields
+
+
+def build_dicts(fields: list) -> list:
+    return [{
+            "video": {"id": f[0], "desc": f[1], "create_time": f[2], "share_link": f[3], "cover_img_url": f[4], "download_url": f[5]},
+            "author": {"id": f[6], "nickname": f[7], "signature": f[8], "icon_img_url_L": f[9], "icon_img_url_M": "", "icon_img_url_S": ""}
+            } for f in fields]
+
+
+def build_records(fields: list) -> list:
+    return [Video(f[0], f[1], f[2], f[3], f[4], f[5], Author(f[6], f[7], f[8], f[9], "", "")) for f in fields]
+
+
+def filter_dicts(results: list) -> list:
+    rows = []
+    for result in results:
+        if result["video"]["share_link"] and result["author"]["id"] and "1" in result["video"]["desc"]:
+            rows.append({"target": "t", "matched_keywords": ["a + b"], "user_id": result["author"]["id"],
+                         "user_nickname": result["author"]["nickname"], "user_signature": result["author"]["signature"],
+                         "video_id": result["video"]["id"], "video_created_time": result["video"]["create_time"],
+                         "video_url": result["video"]["share_link"], "video_desc": result["video"]["desc"], "is_new_video": True})
+    return rows
+
+
+def filter_records(results: list) -> list:
+    rows = []
+    for video in results:
+        author = video.author
+        if video.share_link and author.id and "1" in video.desc:
+            rows.append(ReportRow("t", ["a + b"], author.id, author.nickname, author.signature,
+                                  video.id, video.create_time, video.share_link, video.desc, is_new_video=True))
+    return rows
+
+
+def measure(name: str, build, filter_rows, fields: list, repeat=3):
+    build_seconds = filter_seconds = float("inf")
+    for _ in range(repeat): # timings without tracemalloc overhead
+        start = time.perf_counter()
+        results = build(fields)
+        build_seconds = min(build_seconds, time.perf_counter() - start)
+        start = time.perf_counter()
+        rows = filter_rows(results)
+        filter_seconds = min(filter_seconds, time.perf_counter() - start)
+    del results, rows
+
+    tracemalloc.start()
+    results = build(fields)
+    results_bytes = tracemalloc.get_traced_memory()[0]
+    rows = filter_rows(results)
+    rows_bytes = tracemalloc.get_traced_memory()[0] - results_bytes
+    tracemalloc.stop()
+    print(f"{name:<8} build {build_seconds * 1000:7.1f} ms  {results_bytes / len(fields):6.0f} B/item   "
+          f"filter+rows {filter_seconds * 1000:7.1f} ms  {rows_bytes / max(len(rows), 1):6.0f} B/row")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark record types vs nested dicts.")
+    parser.add_argument("--items", type=int, default=100000)
+    args = parser.parse_args()
+
+    fields = make_fields(args.items) # field strings are shared by both variants and not counted
+    print(f"{args.items} synthetic items")
+    measure("dicts", build_dicts, filter_dicts, fields)
+    measure("records", build_records, filter_records, fields)
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Offline benchmark and accuracy harness for the rotation captcha solver.
+
+Synthetic puzzles are cut from sample images (or generated textures) at known
+angles, sizes and noise levels, and every solver is run against them to report
+latency percentiles and angular error. A corpus directory of captured captcha
+pairs (<name>_inner.png, <name>_outer.png and an optional <name>.json with the
+accepted angle) is replayed as regression fixtures; the scraper writes to it
+when captcha_corpus_dir is configured.
+
+Usage:
+    python captcha_harness.py --puzzles 200 --sizes 340 272 --noise 0 8
+    python captcha_harness.py --corpus captcha_corpus --solvers fft fft-coarse
+"""
+import os
+import json
+import time
+import glob
+import argparse
+import importlib
+from datetime import datetime
+from functools import partial
+import numpy as np
+import cv2
+
+from captcha_solver import solve_rotation
+
+SOLVERS = {
+    "fft": solve_rotation,
+    "fft-coarse": partial(solve_rotation, refine=False),
+}
+DEFAULT_TOLERANCE = 3 # degrees an answer may be off and still pass the slider
+
+
+def angular_error(predicted: float, expected: float) -> float:
+    diff = abs(predicted - expected) % 360
+    return min(diff, 360 - diff)
+
+
+def random_texture(size: int, rng: np.random.Generator) -> np.ndarray:
+    """Smooth random BGR texture, used when no sample images are given."""
+    return cv2.resize(rng.integers(0, 256, (12, 12, 3), dtype=np.uint8), (size, size), interpolation=cv2.INTER_CUBIC)
+
+
+def make_puzzle(image: np.ndarray, angle: float, size=340, radius_ratio=0.31, scale=1.02, noise=0.0, rng=None) -> tuple:
+    """
+    Cut a rotate-the-inner-circle puzzle out of an image.
+
+    Args:
+        image: BGR source image
+        angle: Counterclockwise rotation that solves the puzzle, in degrees
+        size: Side of the outer image in pixels
+        radius_ratio: Radius of the inner disc relative to size
+        scale: The inner disc is rendered 1/scale smaller than the hole, as on TikTok
+        noise: Standard deviation of the gaussian noise added to both images
+        rng: np.random.Generator for the noise
+
+    Returns:
+        tuple: (inner BGRA, outer BGRA)
+    """
+    scene = cv2.resize(image[:, :, :3], (size, size), interpolation=cv2.INTER_AREA)
+    center = (size / 2, size / 2)
+    radius = int(size * radius_ratio)
+
+    yy, xx = np.mgrid[:size, :size]
+    hole = np.hypot(xx - center[0] + 0.5, yy - center[1] + 0.5) <= radius
+    outer = np.dstack([scene, np.where(hole, 0, 255).astype(np.uint8)])
+
+    scrambled = cv2.warpAffine(scene, cv2.getRotationMatrix2D(center, -angle, 1.0), (size, size))
+    top = int(center[0] - radius)
+    inner = scrambled[top:top + 2 * radius, top:top + 2 * radius]
+    inner_size = max(int(round(2 * radius / scale)), 2)
+    inner = cv2.resize(inner, (inner_size, inner_size), interpolation=cv2.INTER_AREA)
+    disc = np.zeros((inner_size, inner_size), dtype=np.uint8)
+    cv2.circle(disc, (inner_size // 2, inner_size // 2), inner_size // 2, 255, -1)
+    inner = np.dstack([inner, disc])
+
+    if noise:
+        rng = rng or np.random.default_rng()
+        for img in (inner, outer):
+            noisy = img[:, :, :3].astype(np.float32) + rng.normal(0, noise, img[:, :, :3].shape)
+            img[:, :, :3] = np.clip(noisy, 0, 255).astype(np.uint8)
+    return inner, outer
+
+
+def synthetic_cases(n_puzzles: int, sizes: list, noises: list, image_paths=None, seed=0):
+    """Yield (case name, inner, outer, expected angle, {"size", "noise"}) for every size x noise combination."""
+    rng = np.random.default_rng(seed)
+    images = [img for img in (cv2.imread(path, cv2.IMREAD_COLOR) for path in image_paths or []) if img is not None]
+    for size in sizes:
+        for noise in noises:
+            for i in range(n_puzzles):
+                image = images[i % len(images)] if images else random_texture(size, rng)
+                angle = float(rng.uniform(0, 360))
+                inner, outer = make_puzzle(image, angle, size=size, noise=noise, rng=rng)
+                yield f"synthetic_{size}_{noise}_{i}", inner, outer, angle, {"size": size, "noise": noise}
+
+
+def save_corpus_case(corpus_dir: str, inner: np.ndarray, outer: np.ndarray, angle=None, verified=False) -> str:
+    """
+    Store a captured captcha pair as a regression fixture.
+
+    Args:
+        corpus_dir: Corpus directory
+        inner: Inner disc image
+        outer: Outer ring image
+        angle: Angle the solver answered
+        verified: Whether the slider accepted that angle
+
+    Returns:
+        str: Case name
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    name = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    cv2.imwrite(os.path.join(corpus_dir, f"{name}_inner.png"), inner)
+    cv2.imwrite(os.path.join(corpus_dir, f"{name}_outer.png"), outer)
+    with open(os.path.join(corpus_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+        json.dump({"angle": angle, "verified": verified}, f)
+    return name
+
+
+def corpus_cases(corpus_dir: str):
+    """Yield (case name, inner, outer, expected angle or None, meta) of a corpus directory."""
+    for inner_path in sorted(glob.glob(os.path.join(corpus_dir, "*_inner.png"))):
+        name = os.path.basename(inner_path)[:-len("_inner.png")]
+        outer_path = os.path.join(corpus_dir, f"{name}_outer.png")
+        if not os.path.exists(outer_path):
+            print(f"Missing outer image of corpus case {name}")
+            continue
+        meta = {}
+        meta_path = os.path.join(corpus_dir, f"{name}.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        expected = meta.get("angle") if meta.get("verified") else None # only accepted answers are ground truth
+        yield (name, cv2.imread(inner_path, cv2.IMREAD_UNCHANGED), cv2.imread(outer_path, cv2.IMREAD_UNCHANGED),
+               expected, {"size": "corpus", "noise": "-"})
+
+
+def _percentile(values: list, q: float):
+    return round(float(np.percentile(values, q)), 3) if values else None
+
+
+def run_benchmark(cases, solvers: dict, tolerance=DEFAULT_TOLERANCE, warmup=True) -> dict:
+    """
+    Run every solver on every case.
+
+    Args:
+        cases: Iterable of (name, inner, outer, expected angle or None, {"size", "noise"})
+        solvers: {solver name: callable(inner, outer) -> angle}
+        tolerance: Maximum angular error of a passing answer, in degrees
+        warmup: Run each solver once before timing
+
+    Returns:
+        dict: {solver: {"size/noise": {"n", "latency_ms": {p50, p90, p99, max},
+                                        "error_deg": {mean, p90, max}, "pass_rate", "failures"}}}
+    """
+    cases = list(cases)
+    results = {}
+    for solver_name, solver in solvers.items():
+        if warmup and cases:
+            solver(cases[0][1], cases[0][2])
+        groups = {}
+        for name, inner, outer, expected, meta in cases:
+            start = time.perf_counter()
+            predicted = solver(inner, outer)
+            latency_ms = (time.perf_counter() - start) * 1000
+            group = groups.setdefault(f"{meta['size']}/{meta['noise']}", {"latencies": [], "errors": [], "failures": []})
+            group["latencies"].append(latency_ms)
+            if expected is not None:
+                error = angular_error(predicted, expected)
+                group["errors"].append(error)
+                if error > tolerance:
+                    group["failures"].append({"case": name, "expected": round(expected, 2), "predicted": round(float(predicted), 2)})
+
+        results[solver_name] = {key: {
+                                    "n": len(group["latencies"]),
+                                    "latency_ms": {q: _percentile(group["latencies"], p) for q, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))},
+                                    "error_deg": {"mean": round(float(np.mean(group["errors"])), 3) if group["errors"] else None,
+                                                  "p90": _percentile(group["errors"], 90),
+                                                  "max": _percentile(group["errors"], 100)},
+                                    "pass_rate": round(1 - len(group["failures"]) / len(group["errors"]), 3) if group["errors"] else None,
+                                    "failures": group["failures"]
+                                    } for key, group in groups.items()}
+    return results
+
+
+def load_solver(spec: str):
+    """A registered solver name, or 'module:function'."""
+    if spec in SOLVERS:
+        return SOLVERS[spec]
+    module_name, _, func_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def print_report(results: dict):
+    print(f"{'solver':<14}{'size/noise':<14}{'n':>5}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'err mean':>10}{'err max':>9}{'pass':>7}")
+    for solver_name, groups in results.items():
+        for key, stats in groups.items():
+            fmt = lambda value: "-" if value is None else value
+            print(f"{solver_name:<14}{key:<14}{stats['n']:>5}"
+                  f"{fmt(stats['latency_ms']['p50']):>9}{fmt(stats['latency_ms']['p90']):>9}{fmt(stats['latency_ms']['p99']):>9}"
+                  f"{fmt(stats['error_deg']['mean']):>10}{fmt(stats['error_deg']['max']):>9}{fmt(stats['pass_rate']):>7}")
+            for failure in stats["failures"][:5]:
+                print(f"    ✗ {failure}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark rotation captcha solvers offline.")
+    parser.add_argument("--solvers", nargs="+", default=["fft"], help="Registered solver names or module:function")
+    parser.add_argument("--puzzles", type=int, default=100, help="Synthetic puzzles per size/noise combination (0 to skip)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[340], help="Outer image sizes in pixels")
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.0, 8.0], help="Gaussian noise levels")
+    parser.add_argument("--images", default=None, help="Directory of sample images to cut puzzles from")
+    parser.add_argument("--corpus", default=None, help="Directory of captured captcha pairs to replay")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Maximum passing angular error (degrees)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    image_paths = [path for ext in ("png", "jpg", "jpeg") for path in glob.glob(os.path.join(args.images, f"*.{ext}"))] if args.images else None
+    cases = list(synthetic_cases(args.puzzles, args.sizes, args.noise, image_paths, args.seed)) if args.puzzles else []
+    if args.corpus:
+        cases += list(corpus_cases(args.corpus))
+
+    results = run_benchmark(cases, {spec: load_solver(spec) for spec in args.solvers}, tolerance=args.tolerance)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.json}")
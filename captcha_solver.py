@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Rotation captcha solver.
+
+The puzzle shows an inner disc rotated against the outer ring around it. Both
+images are unwrapped once into polar coordinates (cv2.warpPolar); the pixels
+just inside the disc's edge and just outside the ring's hole are averaged into
+two angular profiles, and the rotation that makes them continuous is the peak
+of their circular cross-correlation, computed with an FFT. A parabolic fit
+around the peak refines it below one angular bin.
+"""
+import numpy as np
+import cv2
+
+ANGULAR_BINS = 720 # 0.5 degree per bin before refinement
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """Decode PNG/JPEG bytes (alpha kept) into an array."""
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+
+
+def _disc_radius(img: np.ndarray) -> float:
+    """Radius of the visible disc: from the alpha channel if any, else half the shorter side."""
+    if img.ndim == 3 and img.shape[2] == 4:
+        opaque = np.count_nonzero(img[:, :, 3] > 127)
+        if opaque:
+            return float(np.sqrt(opaque / np.pi))
+    return min(img.shape[:2]) / 2
+
+
+def _ring_profile(img: np.ndarray, radius_from: float, radius_to: float, angular_bins: int) -> np.ndarray:
+    """
+    Mean color of each angle over the band radius_from..radius_to around the image center.
+
+    Returns:
+        np.ndarray: (angular_bins, channels) float32, angle 0 at +x, increasing clockwise on screen
+    """
+    channels = img[:, :, :3] if img.ndim == 3 else img[:, :, None]
+    center = (img.shape[1] / 2, img.shape[0] / 2)
+    max_radius = radius_to + 1
+    radial_bins = max(int(np.ceil(max_radius)), 1)
+    polar = cv2.warpPolar(np.ascontiguousarray(channels), (radial_bins, angular_bins), center, max_radius,
+                          cv2.WARP_POLAR_LINEAR | cv2.INTER_LINEAR)
+    polar = polar.reshape(angular_bins, radial_bins, -1).astype(np.float32)
+    lo = int(radius_from / max_radius * radial_bins)
+    hi = max(int(np.ceil(radius_to / max_radius * radial_bins)), lo + 1)
+    return polar[:, lo:hi].mean(axis=1)
+
+
+def solve_rotation(inner: np.ndarray, outer: np.ndarray, refine=True, band=3, gap=1, scale=1.02) -> float:
+    """
+    Find the angle that aligns the inner disc with the outer ring.
+
+    Args:
+        inner: Inner disc image (gray, BGR or BGRA)
+        outer: Outer ring image, same pixel scale as inner
+        refine: Sub-bin (parabolic) refinement of the correlation peak
+        band: Width in pixels of the compared ring on each side of the edge
+        gap: Pixels skipped on each side of the edge (antialiasing)
+        scale: Rendering scale of the inner disc relative to the hole in the ring
+
+    Returns:
+        float: Counterclockwise rotation in degrees [0, 360) to apply to inner
+               (same convention as cv2.getRotationMatrix2D)
+    """
+    radius = _disc_radius(inner)
+    inner_profile = _ring_profile(inner, radius - gap - band, radius - gap, ANGULAR_BINS)
+    outer_radius = radius * scale
+    outer_profile = _ring_profile(outer, outer_radius + gap, outer_radius + gap + band, ANGULAR_BINS)
+
+    inner_profile -= inner_profile.mean(axis=0)
+    outer_profile -= outer_profile.mean(axis=0)
+    # corr[k] = sum_t inner(t + k) * outer(t): rotating inner counterclockwise by k bins aligns it
+    spectrum = np.fft.rfft(inner_profile, axis=0) * np.conj(np.fft.rfft(outer_profile, axis=0))
+    corr = np.fft.irfft(spectrum, n=ANGULAR_BINS, axis=0).sum(axis=1)
+
+    peak = int(np.argmax(corr))
+    offset = 0.0
+    if refine:
+        left, center, right = corr[peak - 1], corr[peak], corr[(peak + 1) % ANGULAR_BINS]
+        denominator = left - 2 * center + right
+        if denominator < 0:
+            offset = 0.5 * (left - right) / denominator
+    return ((peak + offset) * 360 / ANGULAR_BINS) % 360
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Archive of the raw TikTok API responses fetched by the scraper.
+
+Each endpoint call (one search, one profile crawl...) is appended as one
+gzip-compressed JSON line holding its raw response pages, tagged with the
+endpoint, the query, the capture time and the targets it was fetched for.
+The archives are read back by ReplayScraper to re-run the scout's filters
+without a browser, and double as fixtures for the benchmarks.
+
+Usage:
+    python capture_archive.py captures/*.jsonl.gz
+"""
+import os
+import gzip
+import json
+import time
+import argparse
+from glob import glob
+from collections import Counter
+
+from item_parser import parse_json
+
+
+class CaptureArchive:
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: .jsonl.gz file to append to (created with its directory if missing)
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self.stats = {"captures": 0, "pages": 0}
+
+    def write(self, endpoint: str, query: str, pages: list, **tags):
+        """
+        Append the response pages of one endpoint call.
+
+        Args:
+            endpoint: Endpoint name, e.g. "video_search"
+            query: Keyword, hashtag or profile URL the pages were fetched for
+            pages: Parsed response JSONs, in page order
+            tags: Extra fields of the record, e.g. targets=[...]
+        """
+        record = dict(tags, endpoint=endpoint, query=query, timestamp=time.time(), pages=pages)
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.stats["captures"] += 1
+        self.stats["pages"] += len(pages)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def archive_paths(patterns) -> list:
+    """Expand files, directories (every .jsonl.gz inside) and glob patterns into sorted archive paths."""
+    paths = []
+    for pattern in ([patterns] if isinstance(patterns, str) else patterns):
+        if os.path.isdir(pattern):
+            paths += glob(os.path.join(pattern, "*.jsonl.gz"))
+        else:
+            paths += glob(pattern) or [pattern]
+    return sorted(set(paths))
+
+
+def iter_records(patterns):
+    """Yield the records of the archives, file by file in path order. Truncated trailing lines are skipped."""
+    for path in archive_paths(patterns):
+        try:
+            with gzip.open(path, "rb") as f:
+                for line in f:
+                    record = parse_json(line)
+                    if record is not None:
+                        yield record
+        except EOFError:
+            print(f"Archive {path} is truncated; its complete records were read.")
+
+
+def load_captures(patterns) -> dict:
+    """
+    Index the archived pages by endpoint call.
+
+    Returns:
+        dict: (endpoint, query) -> pages of the latest capture of that call
+    """
+    captures = {}
+    for record in iter_records(patterns):
+        captures[(record["endpoint"], record["query"])] = record["pages"]
+    return captures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize capture archives.")
+    parser.add_argument("archives", nargs="+", help="Archive files, directories or glob patterns")
+    args = parser.parse_args()
+
+    captures, pages = Counter(), Counter()
+    for record in iter_records(args.archives):
+        captures[record["endpoint"]] += 1
+        pages[record["endpoint"]] += len(record["pages"])
+    for endpoint in sorted(captures):
+        print(f"{endpoint:<16} {captures[endpoint]:>6} captures {pages[endpoint]:>7} pages")
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Pooled HTTP session shared by every API replay and media download of a scraper.
+
+One requests.Session with keep-alive connection pools, default timeouts,
+gzip/brotli negotiation and retries on transient errors. The browser's
+cookies are synced into it; its captured API headers are passed per request
+(never as session defaults, which media downloads share from other threads).
+Per-host pool statistics show how often connections are reused.
+"""
+from collections import defaultdict
+from urllib.parse import urlparse
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import brotli # noqa: F401 (lets urllib3 decode "br" responses)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+# headers managed by the session/transport, never copied from the browser
+NON_FORWARDED_HEADERS = {"cookie", "accept-encoding", "content-length", "host", "connection"}
+
+
+class HttpSessionManager:
+
+    def __init__(self, pool_connections=10, pool_maxsize=16, timeout=(5, 30), retries=3, backoff_factor=0.5):
+        """
+        Args:
+            pool_connections: Number of per-host pools to keep
+            pool_maxsize: Keep-alive connections per host (>= the number of concurrent workers)
+            timeout: Default (connect, read) timeout in seconds
+            retries: Retries on connection errors and 429/5xx responses
+            backoff_factor: Exponential backoff between retries
+        """
+        self.timeout = tuple(timeout) if isinstance(timeout, (list, tuple)) else timeout
+        retry = Retry(total=retries, connect=retries, read=retries, backoff_factor=backoff_factor,
+                      status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset(["GET", "HEAD"]),
+                      raise_on_status=False)
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        self.session.hooks["response"].append(self._count_response)
+        self._requests_per_host = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _count_response(self, response, *args, **kwargs):
+        with self._lock:
+            self._requests_per_host[urlparse(response.url).netloc] += 1
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def sync_cookies(self, cookies: list):
+        """
+        Replace the session cookie jar with the browser's cookies.
+
+        Args:
+            cookies: Cookie dicts as returned by driver.get_cookies()
+        """
+        self.session.cookies.clear()
+        for cookie in cookies:
+            self.session.cookies.set(cookie["name"], cookie["value"],
+                                     domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+
+    @staticmethod
+    def forwardable_headers(headers: dict) -> dict:
+        """Captured headers minus the ones the session manages itself."""
+        return {name: value for name, value in headers.items()
+                if name.lower() not in NON_FORWARDED_HEADERS - {"cookie"} and not name.startswith(":")}
+
+    def pool_stats(self) -> dict:
+        """
+        Per-host connection statistics.
+
+        Returns:
+            dict: {host: {"requests", "connections", "reuse_rate"}}; connections are only
+                  known while the host's pool is alive
+        """
+        connections = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+                connections[host] = connections.get(host, 0) + pool.num_connections
+
+        stats = {}
+        with self._lock:
+            for host, n_requests in self._requests_per_host.items():
+                n_connections = connections.get(host)
+                stats[host] = {
+                                "requests": n_requests,
+                                "connections": n_connections,
+                                "reuse_rate": round(1 - n_connections / n_requests, 3) if n_connections is not None and n_requests else None
+                                }
+        return stats
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled keyword-group matcher for the risk/ignore filters.
+
+A keyword group matches a text when ALL of its terms appear in it
+(case-insensitive substring match), e.g. [["alpha", "bank"], ["alpha loan"]].
+All terms of all groups are compiled into one Aho-Corasick automaton, so each
+description is lowercased once and scanned once, no matter how many groups.
+"""
+from collections import deque
+
+
+class KeywordGroupMatcher:
+
+    def __init__(self, keyword_groups: list):
+        """
+        Build the automaton from keyword groups.
+
+        Args:
+            keyword_groups: List of keyword groups (List[List[str]])
+        """
+        self.keyword_groups = [list(kws) for kws in keyword_groups]
+        self.group_names = [" + ".join(kws) for kws in self.keyword_groups]
+
+        ### assign an id to every distinct lowered term
+        term_ids = {}
+        self._group_term_ids = []
+        for kws in self.keyword_groups:
+            ids = set()
+            for kw in kws:
+                ids.add(term_ids.setdefault(kw.lower(), len(term_ids)))
+            self._group_term_ids.append(frozenset(ids))
+        self._empty_term_ids = frozenset(tid for term, tid in term_ids.items() if not term)
+
+        ### groups indexed by each of their terms, so only touched groups are checked
+        self._groups_by_term = {}
+        for group_idx, ids in enumerate(self._group_term_ids):
+            for tid in ids:
+                self._groups_by_term.setdefault(tid, []).append(group_idx)
+        self._always_matched = [i for i, ids in enumerate(self._group_term_ids) if ids <= self._empty_term_ids]
+
+        self._build_automaton([term for term in term_ids if term], term_ids)
+
+    def _build_automaton(self, terms: list, term_ids: dict):
+        goto = [{}]
+        outputs = [set()]
+        for term in terms:
+            state = 0
+            for ch in term:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append(set())
+                state = nxt
+            outputs[state].add(term_ids[term])
+
+        ### breadth-first failure links; merge outputs along the failure chain
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                outputs[nxt] |= outputs[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [frozenset(out) for out in outputs]
+
+    def _found_term_ids(self, text: str) -> set:
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found = set(self._empty_term_ids)
+        state = 0
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+    def matched_group_indices(self, text: str) -> list:
+        """
+        Scan the text once and return the indices of fully matched groups.
+
+        Args:
+            text: Text to scan (e.g. video description)
+
+        Returns:
+            list: Sorted indices into keyword_groups
+        """
+        if not text:
+            return list(self._always_matched)
+        found = self._found_term_ids(text)
+        candidates = set(self._always_matched)
+        for tid in found:
+            candidates.update(self._groups_by_term.get(tid, ()))
+        return sorted(i for i in candidates if self._group_term_ids[i] <= found)
+
+    def matched_keywords(self, text: str) -> list:
+        """Return the fully matched groups as 'term1 + term2' strings."""
+        return [self.group_names[i] for i in self.matched_group_indices(text)]
+
+    def any_match(self, text: str) -> bool:
+        """Equivalent to any(all(kw.lower() in text.lower() for kw in kws) for kws in keyword_groups)."""
+        return bool(self.matched_group_indices(text))
+
+    def __len__(self) -> int:
+        return len(self.keyword_groups)
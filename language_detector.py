@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Single-pass script detector for the language exclusion filter.
+
+The codepoint ranges are compiled once into a lookup table; each text is then
+walked once and every character is mapped to its script, giving the set of
+scripts present and the share of each among the text's letters.
+"""
+from collections import Counter
+
+SCRIPT_RANGES = {
+    "english":    [(0x0041, 0x005A), (0x0061, 0x007A)],
+    "chinese":    [(0x4E00, 0x9FFF)],
+    "tibetan":    [(0x0F00, 0x0FFF)],
+    "thai":       [(0x0E00, 0x0E7F)],
+    "devanagari": [(0x0900, 0x097F)],
+    "myanmar":    [(0x1000, 0x109F)],
+    "greek":      [(0x0370, 0x03FF)],
+    "cyrillic":   [(0x0400, 0x04FF)],
+    "hebrew":     [(0x0590, 0x05FF)],
+    "tamil":      [(0x0B80, 0x0BFF)],
+    "ethiopic":   [(0x1200, 0x137F)],
+    "korean":     [(0xAC00, 0xD7AF), (0x1100, 0x11FF)],
+    "japanese":   [(0x3040, 0x30FF), (0x31F0, 0x31FF), (0xFF66, 0xFF9D)],
+    "arabic":     [(0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)],
+}
+# Vietnamese is Latin-based, so only its distinctive letters are counted as "vietnamese"
+VIETNAMESE_CHARS = "ăâêôơưđĂÂÊÔƠƯĐáàảãạấầẩẫậắằẳẵặéèẻẽẹếềểễệíìỉĩịóòỏõọốồổỗộớờởỡợúùủũụứừửữựýỳỷỹỵ₫"
+
+SCRIPT_ALIASES = {
+    # names used by contains_language
+    "英文": "english", "中文": "chinese", "藏文": "tibetan", "泰文": "thai", "天城文": "devanagari",
+    "緬甸文": "myanmar", "希臘文": "greek", "西里爾文": "cyrillic", "希伯來文": "hebrew", "泰米爾文": "tamil",
+    "衣索比亞文": "ethiopic", "韓文": "korean", "日文": "japanese", "阿拉伯文": "arabic", "越南文": "vietnamese",
+    # common English names and ISO 639-1 codes (as suggested by the optimizer)
+    "latin": "english", "en": "english", "zh": "chinese", "bo": "tibetan", "th": "thai",
+    "hindi": "devanagari", "hi": "devanagari", "burmese": "myanmar", "my": "myanmar", "el": "greek",
+    "russian": "cyrillic", "ru": "cyrillic", "he": "hebrew", "ta": "tamil", "amharic": "ethiopic",
+    "am": "ethiopic", "ko": "korean", "ja": "japanese", "ar": "arabic", "vi": "vietnamese",
+}
+
+TABLE_SIZE = 0x10000 # all supported scripts live in the BMP
+
+
+class ScriptDetector:
+
+    def __init__(self):
+        self.scripts = list(SCRIPT_RANGES) + ["vietnamese"]
+        table = bytearray(TABLE_SIZE) # 0 means "no supported script"
+        for script_idx, script in enumerate(self.scripts, start=1):
+            for start, end in SCRIPT_RANGES.get(script, []):
+                table[start:end + 1] = bytes([script_idx]) * (end - start + 1)
+        for ch in VIETNAMESE_CHARS:
+            table[ord(ch)] = self.scripts.index("vietnamese") + 1
+        self._table = bytes(table)
+        self._warned = set()
+
+    def resolve(self, language: str) -> str:
+        """
+        Map a language/script name to its canonical script name.
+
+        Args:
+            language: Chinese name (e.g. '泰文'), English name (e.g. 'thai') or ISO code (e.g. 'th')
+
+        Returns:
+            str: Canonical script name, or '' if unsupported
+        """
+        name = language.strip()
+        name = SCRIPT_ALIASES.get(name) or SCRIPT_ALIASES.get(name.lower()) or name.lower()
+        if name in self.scripts:
+            return name
+        if language not in self._warned:
+            self._warned.add(language)
+            print(f"[ScriptDetector] Unsupported Language: {language}")
+        return ''
+
+    def resolve_languages(self, languages: list) -> set:
+        """Resolve a languages2ignore list once, dropping unsupported entries."""
+        return {script for script in map(self.resolve, languages) if script}
+
+    def script_ratios(self, text: str) -> dict:
+        """
+        Walk the text once and return the share of each detected script.
+
+        Ratios are relative to the number of letters in the text (characters
+        of a supported script plus any other alphabetic characters).
+
+        Returns:
+            dict: {script name: ratio in (0, 1]}
+        """
+        if not text:
+            return {}
+        table, scripts = self._table, self.scripts
+        counts = {}
+        total = 0
+        for ch, n in Counter(text).items():
+            code = ord(ch)
+            script_idx = table[code] if code < TABLE_SIZE else 0
+            if script_idx:
+                counts[script_idx] = counts.get(script_idx, 0) + n
+                total += n
+            elif ch.isalpha():
+                total += n
+        return {scripts[idx - 1]: n / total for idx, n in counts.items()}
+
+    def detect(self, text: str) -> set:
+        """Return the set of scripts present in the text."""
+        return set(self.script_ratios(text))
+
+    def contains_any(self, text: str, scripts: set, min_ratio=0.0) -> bool:
+        """
+        Check whether any of the given scripts makes up at least min_ratio of the text.
+
+        Args:
+            text: Text to check
+            scripts: Canonical script names (see resolve_languages)
+            min_ratio: 0 means "contains at least one character of the script"
+
+        Returns:
+            bool
+        """
+        if not scripts:
+            return False
+        return any(ratio >= min_ratio for script, ratio in self.script_ratios(text).items() if script in scripts)
+
+    def script_ratios_batch(self, texts: list) -> list:
+        """script_ratios over a whole page of descriptions."""
+        return [self.script_ratios(text) for text in texts]
+
+    def contains_any_batch(self, texts: list, languages: list, min_ratio=0.0) -> list:
+        """
+        contains_any over a whole page of descriptions.
+
+        Args:
+            texts: Descriptions to check
+            languages: Language names in any supported form
+            min_ratio: See contains_any
+
+        Returns:
+            list: One bool per text
+        """
+        scripts = self.resolve_languages(languages)
+        return [self.contains_any(text, scripts, min_ratio=min_ratio) for text in texts]
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Client of the logo classification API.
+
+Requests go through one pooled HTTP session with bounded concurrency, and
+results are cached in SQLite keyed by the SHA-256 of the image bytes, so an
+avatar shared by several users, or seen again in a later run, is classified
+only once. Failed requests are not cached.
+"""
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from http_session import HttpSessionManager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logo_cache (
+    sha256        TEXT PRIMARY KEY,
+    label         TEXT NOT NULL,
+    class_prob    REAL,
+    classified_at REAL NOT NULL
+);
+"""
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class LogoClassifier:
+
+    def __init__(self, api_url: str, cache_path=None, workers=4, timeout=(5, 30), threshold=0.999999):
+        """
+        Args:
+            api_url: LOGO_CLASSIFICATION_API_URL
+            cache_path: SQLite file of the result cache. None keeps the cache in memory only
+            workers: Maximum concurrent requests
+            timeout: (connect, read) timeout in seconds
+            threshold: Minimum class_prob for a logo to count as detected
+        """
+        self.api_url = api_url
+        self.workers = workers
+        self.threshold = threshold
+        self.http = HttpSessionManager(pool_maxsize=max(workers, 1), timeout=timeout, retries=2)
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(cache_path or ":memory:", check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.stats = {"cache_hits": 0, "requests": 0, "errors": 0, "request_seconds": 0.0}
+
+    def _cached(self, digest: str):
+        with self._lock:
+            row = self.conn.execute("SELECT label FROM logo_cache WHERE sha256 = ?", (digest,)).fetchone()
+        return None if row is None else row[0]
+
+    def _store(self, digest: str, label: str, class_prob):
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO logo_cache (sha256, label, class_prob, classified_at) VALUES (?, ?, ?, ?)",
+                              (digest, label, class_prob, time.time()))
+            self.conn.commit()
+
+    def _request(self, data: bytes, filename: str):
+        """POST one image. Returns (label, class_prob), or None on failure."""
+        start = time.perf_counter()
+        try:
+            response = self.http.post(self.api_url, files={"file": (filename, data)})
+            response.raise_for_status()
+            result = response.json()["recognition_result"]
+            class_prob = float(result["class_prob"])
+            label = result["pred_class_name"].split('#')[0] if class_prob > self.threshold else ''
+            return label, class_prob
+        except Exception as e:
+            print(f"[LogoClassifier] {type(e).__name__}: {e} ({filename = })")
+            with self._lock:
+                self.stats["errors"] += 1
+            return None
+        finally:
+            with self._lock:
+                self.stats["requests"] += 1
+                self.stats["request_seconds"] += time.perf_counter() - start
+
+    def classify_bytes(self, data: bytes, filename="icon.png"):
+        """
+        Classify one image.
+
+        Returns:
+            str or None: Detected logo ('' if none), or None if the API call failed
+        """
+        digest = content_hash(data)
+        label = self._cached(digest)
+        if label is not None:
+            with self._lock:
+                self.stats["cache_hits"] += 1
+            return label
+        result = self._request(data, filename)
+        if result is None:
+            return None
+        self._store(digest, *result)
+        return result[0]
+
+    def classify(self, image_path: str):
+        """Classify an image file (see classify_bytes)."""
+        with open(image_path, "rb") as f:
+            return self.classify_bytes(f.read(), os.path.basename(image_path))
+
+    def classify_many(self, image_paths) -> dict:
+        """
+        Classify image files concurrently; identical images are sent once.
+
+        Returns:
+            dict: {image_path: detected logo ('' if none) or None on failure}
+        """
+        by_digest = {}
+        for image_path in dict.fromkeys(image_paths):
+            try:
+                with open(image_path, "rb") as f:
+                    data = f.read()
+            except OSError as e:
+                print(f"[LogoClassifier] {e}")
+                continue
+            by_digest.setdefault(content_hash(data), (data, []))[1].append(image_path)
+
+        labels = {}
+        with ThreadPoolExecutor(max_workers=max(self.workers, 1)) as pool:
+            futures = {digest: pool.submit(self.classify_bytes, data, os.path.basename(paths[0]))
+                       for digest, (data, paths) in by_digest.items()}
+            for digest, future in futures.items():
+                for image_path in by_digest[digest][1]:
+                    labels[image_path] = future.result()
+        return labels
+
+    def close(self):
+        self.http.close()
+        with self._lock:
+            self.conn.close()
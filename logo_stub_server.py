@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Local stub of the logo classification API, for offline throughput benchmarks.
+
+Answers every POST with a recognition_result derived from a hash of the request
+body (so the same image always gets the same answer), after an optional
+simulated latency.
+
+Usage:
+    python logo_stub_server.py --port 8765 --latency-ms 80
+    python logo_stub_server.py --bench --images downloaded_icons --workers 1 4 8
+"""
+import os
+import glob
+import json
+import time
+import hashlib
+import tempfile
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from logo_classifier import LogoClassifier
+
+STUB_LABELS = ["", "bank_a#0", "bank_b#1", "insurer_c#2"]
+
+
+def make_handler(latency_ms=0.0):
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            digest = hashlib.sha256(body).digest()
+            label = STUB_LABELS[digest[0] % len(STUB_LABELS)]
+            result = {"recognition_result": {"pred_class_name": label or "no_logo#-1",
+                                             "class_prob": 0.9999999 if label else 0.42}}
+            payload = json.dumps(result).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return StubHandler
+
+
+def start_stub_server(port=0, latency_ms=0.0) -> ThreadingHTTPServer:
+    """Serve the stub in a background thread. The API URL is http://127.0.0.1:{server.server_address[1]}/"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench(api_url: str, image_paths: list, workers_list: list):
+    """Classify image_paths once cold (empty cache) and once warm per worker count, printing images/sec."""
+    for workers in workers_list:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            classifier = LogoClassifier(api_url, cache_path=os.path.join(tmp_dir, "logo_cache.sqlite"), workers=workers)
+            for run in ("cold", "warm"):
+                start = time.perf_counter()
+                classifier.classify_many(image_paths)
+                seconds = time.perf_counter() - start
+                print(f"{workers = :<3} {run}: {len(image_paths)} images in {seconds:.2f} sec "
+                      f"({len(image_paths) / seconds:.1f} images/sec) {classifier.stats}")
+            classifier.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub logo classification API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated model latency per request")
+    parser.add_argument("--bench", action="store_true", help="Run a throughput benchmark against an in-process stub and exit")
+    parser.add_argument("--images", default=None, help="Directory of icons for --bench (random bytes if omitted)")
+    parser.add_argument("--n-images", type=int, default=200, help="Number of random images for --bench without --images")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    if args.bench:
+        server = start_stub_server(latency_ms=args.latency_ms)
+        api_url = f"http://127.0.0.1:{server.server_address[1]}/"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if args.images:
+                image_paths = sorted(glob.glob(os.path.join(args.images, "*.png")))
+            else:
+                image_paths = []
+                for i in range(args.n_images):
+                    image_paths.append(os.path.join(tmp_dir, f"{i}.png"))
+                    with open(image_paths[-1], "wb") as f:
+                        f.write(os.urandom(2048) if i % 4 else b"shared avatar") # every 4th icon is a duplicate
+            bench(api_url, image_paths, args.workers)
+        server.shutdown()
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.latency_ms))
+        print(f"Stub logo classification API on http://127.0.0.1:{args.port}/ ({args.latency_ms = })")
+        server.serve_forever()
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming, concurrent media downloader for videos and avatars.
+
+Downloads are queued and run by a few worker threads, so the scout keeps
+filtering while media is fetched. Each file is streamed in chunks to a
+"<path>.part" file and atomically renamed once complete; an interrupted
+".part" is resumed with a Range request. Files over the size cap are
+abandoned, and a final file that already exists is never fetched again.
+"""
+import os
+import queue
+import threading
+
+PART_SUFFIX = ".part"
+
+
+class DownloadTooLarge(Exception):
+    pass
+
+
+class MediaDownloader:
+
+    def __init__(self, http, workers=4, max_bytes=200 * 1024 * 1024, chunk_size=64 * 1024, max_queue=1000):
+        """
+        Args:
+            http: HttpSessionManager the downloads go through
+            workers: Parallel download threads
+            max_bytes: Default size cap per file. None disables it
+            chunk_size: Bytes per streamed chunk
+            max_queue: Queued downloads before enqueue blocks
+        """
+        self.http = http
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.stats = {"queued": 0, "downloaded": 0, "resumed": 0, "skipped": 0, "too_large": 0, "failed": 0, "bytes": 0}
+        self.failures = [] # [(url, file_path, reason)]
+
+    def _count(self, key: str, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def download(self, url: str, file_path: str, headers=None, max_bytes=None) -> bool:
+        """
+        Download a file now, in the calling thread.
+
+        Args:
+            url: Media URL
+            file_path: Destination path
+            headers: Optional request headers (e.g. cookie)
+            max_bytes: Size cap overriding the default
+
+        Returns:
+            bool: True if the file is present and complete
+        """
+        if os.path.exists(file_path):
+            self._count("skipped")
+            return True
+        max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        part_path = file_path + PART_SUFFIX
+        try:
+            if not self._stream_to_part(url, part_path, dict(headers or {}), max_bytes):
+                return self._fail(url, file_path, "incomplete (kept for resume)")
+            os.replace(part_path, file_path)
+            self._count("downloaded")
+            return True
+        except DownloadTooLarge as e:
+            self._count("too_large")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            return self._fail(url, file_path, str(e))
+        except Exception as e:
+            return self._fail(url, file_path, f"{type(e).__name__}: {e}")
+
+    def _fail(self, url: str, file_path: str, reason: str) -> bool:
+        self._count("failed")
+        with self._lock:
+            self.failures.append((url, file_path, reason))
+        return False
+
+    def _stream_to_part(self, url: str, part_path: str, headers: dict, max_bytes) -> bool:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        with self.http.get(url, headers=headers, stream=True) as response:
+            if response.status_code == 416: # stale .part: start over
+                os.remove(part_path)
+                headers.pop("Range")
+                return self._stream_to_part(url, part_path, headers, max_bytes)
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                offset = 0 # server ignored the range
+            elif offset:
+                self._count("resumed")
+
+            expected = None
+            if "Content-Encoding" not in response.headers and response.headers.get("Content-Length", "").isdigit():
+                expected = offset + int(response.headers["Content-Length"])
+            if max_bytes and expected and expected > max_bytes:
+                raise DownloadTooLarge(f"{expected} bytes > cap of {max_bytes}")
+
+            size = offset
+            with open(part_path, "ab" if offset else "wb") as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+                    size += len(chunk)
+                    self._count("bytes", len(chunk))
+                    if max_bytes and size > max_bytes:
+                        raise DownloadTooLarge(f"over the cap of {max_bytes} bytes")
+        return expected is None or size == expected
+
+    def enqueue(self, url: str, file_path: str, headers=None, max_bytes=None) -> bool:
+        """
+        Queue a download for the worker threads (blocks while the queue is full).
+
+        Returns:
+            bool: False if the file already exists or is already queued
+        """
+        with self._lock:
+            if file_path in self._pending:
+                return False
+            if os.path.exists(file_path):
+                self.stats["skipped"] += 1
+                return False
+            self._pending.add(file_path)
+            self.stats["queued"] += 1
+            if not self._threads:
+                self._start_workers()
+        self._queue.put((url, file_path, headers, max_bytes))
+        return True
+
+    def _start_workers(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"media-downloader-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            url, file_path, headers, max_bytes = job
+            try:
+                self.download(url, file_path, headers=headers, max_bytes=max_bytes)
+            finally:
+                with self._lock:
+                    self._pending.discard(file_path)
+                self._queue.task_done()
+
+    def join(self):
+        """Wait until every queued download is finished."""
+        self._queue.join()
+
+    def close(self):
+        """Finish the queued downloads and stop the workers."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
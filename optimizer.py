@@ -3,6 +3,7 @@ import json
 import pandas as pd
 from datetime import datetime, timedelta
 from openai import AzureOpenAI
+from report_sink import read_report, jsonl_path_for
 
 # === Azure OpenAI Configuration ===
 import os
@@ -92,11 +93,13 @@ def save_target_info(target_info):
 def load_latest_report(target, lookback_days=7):
     for i in range(lookback_days):
         date_str = (datetime.today() - timedelta(days=i)).strftime("%Y%m%d")
-        filepath = os.path.join(REPORTS_DIR, f"target2detect_{date_str}.xlsx")
-        if os.path.exists(filepath):
-            print(f"📄 Found report for {date_str}: {filepath}")
-            df = pd.read_excel(filepath)
-            return df[df["target"] == target]
+        # per-target report (multi-target scan) first, then the combined daily report
+        for filepath in (os.path.join(REPORTS_DIR, f"target2detect_{date_str}_{target}.xlsx"),
+                         os.path.join(REPORTS_DIR, f"target2detect_{date_str}.xlsx")):
+            if os.path.exists(filepath) or os.path.exists(jsonl_path_for(filepath)):
+                print(f"📄 Found report for {date_str}: {filepath}")
+                df = read_report(filepath)
+                return df[df["target"] == target]
     raise FileNotFoundError(f"No report file found in the past {lookback_days} days.")
 
 def prepare_samples(df, max_samples=100):
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental reader of Chrome's performance (Network) log.
+
+driver.get_log("performance") drains every event the page produced since the
+last call: images, fonts, scripts, websockets... Only the few API requests the
+scraper replays are of interest, so each raw entry is rejected by cheap
+substring checks before any JSON parsing. Accepted requests get a monotonic
+sequence number, are indexed by endpoint path and keep their CDP requestId;
+their Network.responseReceived events are recorded too, so the response body
+can be read from the browser (Network.getResponseBody) once their
+Network.loadingFinished event is logged (matched by requestId without parsing
+the event). A read cursor makes
+each lookup return only what was captured since the previous one, and
+start_navigation drains the log before a page load so that late requests of
+the previous document (recognized by their CDP loaderId) are never returned
+for the next one.
+"""
+import re
+import json
+from collections import deque, namedtuple
+from urllib.parse import urlparse
+
+REQUEST_EVENT = '"Network.requestWillBeSent"'
+RESPONSE_EVENT = '"Network.responseReceived"'
+LOADING_FINISHED_EVENT = '"Network.loadingFinished"'
+LOADING_FAILED_EVENT = '"Network.loadingFailed"'
+REQUEST_ID_PATTERN = re.compile(r'"requestId":\s*"([^"]+)"')
+SET_COOKIE_MARKER = "et-cookie" # matches both "set-cookie" and "Set-Cookie"
+# cookies the scraper's API replays depend on; a Set-Cookie of any other cookie is ignored
+DEFAULT_TRACKED_COOKIES = ("ttwid", "msToken", "sessionid", "sid_tt", "tt_chain_token")
+DEFAULT_URL_MARKERS = ("/api/",)
+# documents navigated away from whose late requests are still filtered out; older ones have long gone quiet
+MAX_STALE_LOADERS = 64
+
+CapturedRequest = namedtuple("CapturedRequest", ["seq", "request_id", "url", "endpoint", "headers", "timestamp", "loader_id"])
+
+
+def endpoint_of(url: str) -> str:
+    """'https://www.tiktok.com/api/search/item/full/?q=1' -> '/api/search/item/full'"""
+    return urlparse(url).path.rstrip("/") or "/"
+
+
+class PerformanceLogReader:
+
+    def __init__(self, url_markers=DEFAULT_URL_MARKERS, max_captured=2000, tracked_cookies=DEFAULT_TRACKED_COOKIES):
+        """
+        Args:
+            url_markers: Substrings one of which a request URL must contain to be parsed at all
+            max_captured: Captured requests kept in memory (oldest are dropped)
+            tracked_cookies: Cookie names whose new values (in logged Set-Cookie headers) count as cookie changes
+        """
+        self.url_markers = tuple(url_markers)
+        self.max_captured = max_captured
+        self._captured = deque(maxlen=max_captured)
+        self._by_endpoint = {}
+        self._by_request_id = {}
+        self._responses = {} # requestId -> HTTP status of captured requests
+        self._loading = {} # requestId -> True once loading finished, False if it failed
+        self._next_seq = 0
+        self.cursor = 0
+        self._stale_loaders = {} # loaderIds of the last MAX_STALE_LOADERS documents navigated away from (a dict keeps their order)
+        self._loaders = set() # loaderIds of the captured requests
+        self.cookie_changes = 0 # Set-Cookie headers giving a tracked cookie a new value, found without JSON parsing
+        self._cookie_pattern = re.compile(r"(?:(?<!\w)|(?<=\\n))(%s)=([^;\\\"\s]*)" % "|".join(map(re.escape, tracked_cookies))) # \n: JSON-escaped header line break
+        self._cookie_values = {}
+        self.stats = {"entries": 0, "parsed": 0, "captured": 0}
+
+    def _prefilter(self, message: str) -> bool:
+        return (REQUEST_EVENT in message or RESPONSE_EVENT in message) and any(marker in message for marker in self.url_markers)
+
+    def poll(self, driver) -> int:
+        """
+        Drain the driver's performance log into the capture index.
+
+        Returns:
+            int: Number of newly captured requests
+        """
+        n_captured = 0
+        for entry in driver.get_log("performance"):
+            self.stats["entries"] += 1
+            message = entry.get("message", "")
+            if SET_COOKIE_MARKER in message:
+                self._count_cookie_changes(message)
+            if LOADING_FINISHED_EVENT in message or LOADING_FAILED_EVENT in message:
+                match = REQUEST_ID_PATTERN.search(message)
+                if match and match.group(1) in self._by_request_id:
+                    self._loading[match.group(1)] = LOADING_FINISHED_EVENT in message
+                continue
+            if not self._prefilter(message):
+                continue
+            self.stats["parsed"] += 1
+            try:
+                event = json.loads(message)["message"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            params = event.get("params", {})
+            if event.get("method") == "Network.responseReceived":
+                if params.get("requestId") in self._by_request_id:
+                    self._responses[params["requestId"]] = params.get("response", {}).get("status")
+                continue
+            if event.get("method") != "Network.requestWillBeSent":
+                continue
+            request = params.get("request", {})
+            url = request.get("url", "")
+            if not any(marker in url for marker in self.url_markers):
+                continue
+            self._add(CapturedRequest(self._next_seq, params.get("requestId"), url, endpoint_of(url),
+                                      request.get("headers", {}), params.get("timestamp"), params.get("loaderId")))
+            n_captured += 1
+        return n_captured
+
+    def _count_cookie_changes(self, message: str):
+        changed = False
+        for name, value in self._cookie_pattern.findall(message):
+            if self._cookie_values.get(name) != value:
+                self._cookie_values[name] = value
+                changed = True
+        if changed:
+            self.cookie_changes += 1
+
+    def _add(self, captured: CapturedRequest):
+        if len(self._captured) == self.max_captured:
+            oldest = self._captured[0]
+            self._by_endpoint[oldest.endpoint].popleft()
+            if not self._by_endpoint[oldest.endpoint]:
+                del self._by_endpoint[oldest.endpoint]
+            if self._by_request_id.get(oldest.request_id) is oldest:
+                del self._by_request_id[oldest.request_id]
+                self._responses.pop(oldest.request_id, None)
+                self._loading.pop(oldest.request_id, None)
+        self._captured.append(captured)
+        if captured.loader_id:
+            self._loaders.add(captured.loader_id)
+        self._by_request_id[captured.request_id] = captured
+        self._by_endpoint.setdefault(captured.endpoint, deque()).append(captured)
+        self._next_seq += 1
+        self.stats["captured"] += 1
+
+    def start_navigation(self, driver):
+        """
+        Call before loading a new document: drain the log and move the cursor past
+        everything captured so far, so that nothing of the current document (even
+        requests logged after the navigation) is returned by take.
+        """
+        if driver is not None:
+            self.poll(driver)
+        self.cursor = self._next_seq
+        for loader_id in self._loaders:
+            self._stale_loaders.pop(loader_id, None)
+            self._stale_loaders[loader_id] = True
+        while len(self._stale_loaders) > MAX_STALE_LOADERS:
+            del self._stale_loaders[next(iter(self._stale_loaders))]
+        self._loaders = set()
+
+    def requests_for(self, endpoint: str, since=0) -> list:
+        """Captured requests of an endpoint path ('/api/search/item/full'), oldest first."""
+        return [captured for captured in self._by_endpoint.get(endpoint.rstrip("/"), ()) if captured.seq >= since]
+
+    def take(self, url_pattern='.*') -> list:
+        """
+        Captured requests matching url_pattern since the cursor; the cursor then moves past everything captured.
+
+        Args:
+            url_pattern: Regex matched (re.match) against the request URL
+
+        Returns:
+            list: CapturedRequest, oldest first
+        """
+        pattern = re.compile(url_pattern)
+        matched = [captured for captured in self._captured
+                   if captured.seq >= self.cursor and captured.loader_id not in self._stale_loaders and pattern.match(captured.url)]
+        self.cursor = self._next_seq
+        return matched
+
+    def find(self, request_id: str):
+        """Look up a captured request by its CDP requestId."""
+        return self._by_request_id.get(request_id)
+
+    def response_status(self, request_id: str):
+        """HTTP status of a captured request's response. None if no response was logged yet."""
+        return self._responses.get(request_id)
+
+    def loading_state(self, request_id: str):
+        """True once a captured request's body finished loading, False if loading failed, None while pending."""
+        return self._loading.get(request_id)
+
+    def latest(self, url: str):
+        """The most recent captured request of url, or None."""
+        for captured in reversed(self._captured):
+            if captured.url == url:
+                return captured
+        return None
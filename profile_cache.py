@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of crawled TikTok profiles, keyed by unique_id.
+
+A profile (author metadata and its Video list) crawled once is served from
+memory for the rest of the run, so an account matching several keywords is
+crawled once. With a db_path the entries are also kept in SQLite and reused
+by later runs until ttl_hours expires.
+
+It also keeps a high-water mark per (target, user): the newest non-pinned
+video that target's filters already processed. Marks never expire, so a
+profile whose entry is stale is crawled again only down to the oldest mark of
+the targets scanning it. Such partial (delta) crawls are cached in memory for
+the run only, keyed by user and mark.
+"""
+import os
+import json
+import time
+import sqlite3
+
+from records import Video
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    unique_id  TEXT PRIMARY KEY,
+    profile    TEXT NOT NULL,
+    max_pages  INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS target_watermarks (
+    target      TEXT NOT NULL,
+    unique_id   TEXT NOT NULL,
+    video_id    TEXT NOT NULL,
+    create_time INTEGER NOT NULL,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (target, unique_id)
+);
+"""
+
+
+def _dump_profile(profile: dict) -> str:
+    return json.dumps(dict(profile, videos=[video.to_dict() for video in profile["videos"]]), ensure_ascii=False)
+
+
+def _load_profile(data: str) -> dict:
+    profile = json.loads(data)
+    profile["videos"] = [Video.from_dict(video) for video in profile["videos"]]
+    return profile
+
+
+class ProfileCache:
+
+    def __init__(self, db_path=None, ttl_hours=24):
+        """
+        Args:
+            db_path: SQLite file shared across runs. None keeps the cache in memory for this run only
+            ttl_hours: Age after which a cached profile is crawled again
+        """
+        self.ttl_hours = ttl_hours
+        self._memory = {} # unique_id -> (profile, max_pages, fetched_at)
+        self._watermarks = {} # (target, unique_id) -> {"video_id", "create_time"} as first read in this run
+        self._advanced = {} # (target, unique_id) -> mark advanced during this run
+        self.conn = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(db_path)
+            self.conn.executescript(SCHEMA)
+            self.conn.commit()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def _fresh(self, fetched_at: float) -> bool:
+        return self.ttl_hours is None or time.time() - fetched_at < self.ttl_hours * 3600
+
+    @staticmethod
+    def _delta_key(unique_id: str, since: dict) -> tuple:
+        return unique_id, str(since["video_id"]), int(since["create_time"])
+
+    def get(self, unique_id: str, max_pages: int, memory_only=False, since=None):
+        """
+        Get a cached profile crawled at least max_pages deep and not older than the TTL.
+
+        Args:
+            memory_only: Ignore the entries of earlier runs (e.g. when the crawls of this run are archived)
+            since: High-water mark of a delta crawl; its result of this run is returned when there is no full profile
+
+        Returns:
+            dict or None: Profile as returned by TikTokScraper.get_profile_info
+        """
+        for key in ((unique_id,) if since is None else (unique_id, self._delta_key(unique_id, since))):
+            entry = self._memory.get(key)
+            if entry and entry[1] >= max_pages and self._fresh(entry[2]):
+                self.stats["memory_hits"] += 1
+                return entry[0]
+
+        if self.conn is not None and not memory_only:
+            row = self.conn.execute("SELECT profile, max_pages, fetched_at FROM profiles WHERE unique_id = ?", (unique_id,)).fetchone()
+            if row and row[1] >= max_pages and self._fresh(row[2]):
+                profile = _load_profile(row[0])
+                self._memory[unique_id] = (profile, row[1], row[2])
+                self.stats["disk_hits"] += 1
+                return profile
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, unique_id: str, profile: dict, max_pages: int, since=None):
+        """
+        Store a freshly crawled profile. A delta crawl (since set) is kept in memory
+        for this run only, under its mark: it is not the full profile.
+        """
+        fetched_at = time.time()
+        if since is not None:
+            self._memory[self._delta_key(unique_id, since)] = (profile, max_pages, fetched_at)
+            return
+        self._memory[unique_id] = (profile, max_pages, fetched_at)
+        if self.conn is not None:
+            self.conn.execute("INSERT OR REPLACE INTO profiles (unique_id, profile, max_pages, fetched_at) VALUES (?, ?, ?, ?)",
+                              (unique_id, _dump_profile(profile), max_pages, fetched_at))
+            self.conn.commit()
+
+    @staticmethod
+    def _mark_key(mark: dict) -> tuple:
+        return int(mark["create_time"]), int(mark["video_id"])
+
+    def watermark(self, target: str, unique_id: str):
+        """
+        Get the high-water mark of a user for one target, as it was when this run
+        first read it: marks advanced during the run apply to the next run, so
+        repeated delta crawls of a run share one mark (and one cache entry).
+
+        Returns:
+            dict or None: {"video_id", "create_time"} of the newest video the target already processed
+        """
+        key = (target, unique_id)
+        if key not in self._watermarks:
+            row = None
+            if self.conn is not None:
+                row = self.conn.execute("SELECT video_id, create_time FROM target_watermarks WHERE target = ? AND unique_id = ?", key).fetchone()
+            self._watermarks[key] = {"video_id": row[0], "create_time": row[1]} if row else None
+        return self._watermarks[key]
+
+    def common_watermark(self, targets, unique_id: str):
+        """
+        The mark a crawl of the user for all these targets may stop at: the oldest
+        of their marks, or None (full crawl) if any of them has none yet.
+        """
+        marks = [self.watermark(target, unique_id) for target in targets]
+        if not marks or None in marks:
+            return None
+        return min(marks, key=self._mark_key)
+
+    def advance_watermark(self, target: str, unique_id: str, mark) -> bool:
+        """
+        Move a user's high-water mark of one target forward to mark (never backward).
+
+        Args:
+            target: Target whose filters processed the videos
+            unique_id: User's unique_id
+            mark: {"video_id", "create_time"}, e.g. the profile's "high_water_mark", or None
+
+        Returns:
+            bool: Whether the stored mark changed
+        """
+        if not mark:
+            return False
+        current = self._advanced.get((target, unique_id)) or self.watermark(target, unique_id)
+        if current and self._mark_key(current) >= self._mark_key(mark):
+            return False
+        self._advanced[(target, unique_id)] = {"video_id": str(mark["video_id"]), "create_time": int(mark["create_time"])}
+        if self.conn is not None:
+            self.conn.execute("INSERT OR REPLACE INTO target_watermarks (target, unique_id, video_id, create_time, updated_at) VALUES (?, ?, ?, ?, ?)",
+                              (target, unique_id, str(mark["video_id"]), int(mark["create_time"]), time.time()))
+            self.conn.commit()
+        return True
+
+    def expire(self) -> int:
+        """Delete disk profile entries older than the TTL (watermarks are kept). Returns the number deleted."""
+        if self.conn is None or self.ttl_hours is None:
+            return 0
+        cur = self.conn.execute("DELETE FROM profiles WHERE fetched_at < ?", (time.time() - self.ttl_hours * 3600,))
+        self.conn.commit()
+        return cur.rowcount
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
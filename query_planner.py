@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Cross-target query planner.
+
+Collects the keywords2search of every target, normalizes them and plans each
+distinct hashtag/video/user search once. The scout runs the plan and fans each
+result page out to the filters of every target interested in that query.
+"""
+from collections import OrderedDict
+
+SEARCH_KINDS = ("hashtag", "video", "user")
+
+
+def normalize_query(keyword: str) -> str:
+    """Lowercase and collapse whitespace ('Alpha  Bank ' -> 'alpha bank')."""
+    return " ".join(keyword.lower().split())
+
+
+def hashtag_form(query: str) -> str:
+    """Hashtags can't contain spaces ('alpha bank' -> 'alphabank')."""
+    return query.replace(" ", "")
+
+
+class QueryPlanner:
+
+    def __init__(self):
+        self._keywords = OrderedDict() # normalized keyword -> set of targets
+        self._requested = {kind: 0 for kind in SEARCH_KINDS}
+
+    def add_target(self, target: str, keywords2search):
+        """
+        Register a target's search keywords.
+
+        Args:
+            target: Target name
+            keywords2search: Iterable of keyword strings ('alpha bank')
+        """
+        for keyword in keywords2search:
+            query = normalize_query(keyword)
+            if not query:
+                continue
+            self._keywords.setdefault(query, set()).add(target)
+            for kind in SEARCH_KINDS:
+                self._requested[kind] += 1
+
+    def keywords(self) -> list:
+        """Distinct normalized keywords, in registration order."""
+        return list(self._keywords)
+
+    def targets_for(self, query: str) -> set:
+        """Targets interested in a normalized keyword."""
+        return set(self._keywords.get(query, ()))
+
+    def hashtag_queries(self) -> OrderedDict:
+        """Distinct hashtags -> interested targets ('alpha bank' and 'alphabank' share one search)."""
+        hashtags = OrderedDict()
+        for query, targets in self._keywords.items():
+            hashtags.setdefault(hashtag_form(query), set()).update(targets)
+        return hashtags
+
+    def summary(self) -> dict:
+        """
+        Searches requested by all targets vs. searches actually planned.
+
+        Returns:
+            dict: {kind: {"requested", "planned", "saved"}, "total": {...}}
+        """
+        planned = {"hashtag": len(self.hashtag_queries()), "video": len(self._keywords), "user": len(self._keywords)}
+        summary = {kind: {"requested": self._requested[kind],
+                          "planned": planned[kind],
+                          "saved": self._requested[kind] - planned[kind]} for kind in SEARCH_KINDS}
+        summary["total"] = {key: sum(summary[kind][key] for kind in SEARCH_KINDS) for key in ("requested", "planned", "saved")}
+        return summary
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Compact record types of the scraping hot path.
+
+Videos and authors are produced by item_parser, read by the scout's filters,
+and kept rows go to the report sink as ReportRow, without building or copying
+dicts at any step. NamedTuples are a fixed-size tuple per item (no per-item
+__dict__ repeating the key strings) with C-level attribute access.
+"""
+from typing import NamedTuple, Optional, Any
+
+
+class Author(NamedTuple):
+    id: str # uniqueId
+    nickname: str
+    signature: str
+    icon_img_url_L: str = ""
+    icon_img_url_M: str = ""
+    icon_img_url_S: str = ""
+
+    @property
+    def icon_img_url(self) -> str:
+        """Largest available avatar."""
+        return self.icon_img_url_L or self.icon_img_url_M or self.icon_img_url_S
+
+
+class Video(NamedTuple):
+    id: str
+    desc: str
+    create_time: int
+    share_link: str
+    cover_img_url: str = ""
+    download_url: str = ""
+    author: Optional[Author] = None # None for the videos of a profile (the author is the profile)
+
+    def to_dict(self) -> dict:
+        video = self._asdict()
+        video["author"] = self.author._asdict() if self.author else None
+        return video
+
+    @classmethod
+    def from_dict(cls, video: dict) -> "Video":
+        author = video.get("author")
+        return cls(**dict(video, author=Author(**author) if author else None))
+
+
+class ReportRow(NamedTuple):
+    """One report row; the field order is the report's column order."""
+    target: Any = None
+    matched_keywords: Any = None
+    user_id: Any = None
+    user_nickname: Any = None
+    user_signature: Any = None
+    video_id: Any = None
+    video_created_time: Any = None
+    video_url: Any = None
+    video_desc: Any = None
+    video_OCR: Any = None
+    video_ASR: Any = None
+    detected_logo_in_profile_icon: Any = None
+    risk_level: Any = None
+    is_new_video: Any = None
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Append-only columnar accumulator for the scout report.
+
+Rows are appended into one plain list per column and turned into a DataFrame
+once at the end, instead of pd.concat-ing the whole report for every batch.
+"""
+import pandas as pd
+
+from records import ReportRow
+
+REPORT_COLUMNS = list(ReportRow._fields)
+
+
+class ReportBuilder:
+
+    def __init__(self, columns=None):
+        """
+        Args:
+            columns: Fixed report schema. Defaults to REPORT_COLUMNS
+        """
+        self.columns = list(columns or REPORT_COLUMNS)
+        self._data = {col: [] for col in self.columns}
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def append_row(self, row):
+        """Append a ReportRow, or a dict with a subset of the columns."""
+        if isinstance(row, ReportRow) and self.columns == REPORT_COLUMNS:
+            for values, value in zip(self._data.values(), row):
+                values.append(value)
+        else:
+            row = row._asdict() if isinstance(row, ReportRow) else row
+            unknown = row.keys() - self._data.keys()
+            if unknown:
+                raise ValueError(f"Unknown report columns: {sorted(unknown)}")
+            for col, values in self._data.items():
+                values.append(row.get(col))
+        self._rows += 1
+
+    def append_rows(self, rows: list):
+        for row in rows:
+            self.append_row(row)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Build the report DataFrame from the appended rows."""
+        return pd.DataFrame(self._data, columns=self.columns)
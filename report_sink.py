@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming report sink.
+
+Each batch of filtered rows is appended to a JSONL file as soon as it is
+produced, so a crash never loses what was already scanned. The investigator
+Excel file is rendered from that file at the end with openpyxl's write-only
+(constant-memory) workbook, and readers load the JSONL instead of re-parsing
+the xlsx.
+"""
+import os
+import json
+from datetime import datetime, timezone
+import pandas as pd
+from openpyxl import Workbook
+
+from report_builder import REPORT_COLUMNS, ReportBuilder
+from records import ReportRow
+
+EXCEL_TIME_FORMAT = "%Y%m%d %H:%M"
+
+
+def jsonl_path_for(report_path: str) -> str:
+    """The streaming file that backs an Excel report path (report1.xlsx -> report1.jsonl)."""
+    return os.path.splitext(report_path)[0] + ".jsonl"
+
+
+class ReportSink:
+
+    def __init__(self, path: str, columns=None, truncate=True):
+        """
+        Args:
+            path: JSONL file to stream rows into
+            columns: Fixed report schema. Defaults to REPORT_COLUMNS
+            truncate: Start from an empty file
+        """
+        self.path = path
+        self.columns = list(columns or REPORT_COLUMNS)
+        self.rows_written = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if truncate or not os.path.exists(path):
+            open(path, "w", encoding="utf-8").close()
+
+    def __len__(self) -> int:
+        return self.rows_written
+
+    def append_rows(self, rows: list):
+        """Append a batch of rows (ReportRow, or dicts with a subset of the columns) and flush it to disk."""
+        if not rows:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            for row in rows:
+                if isinstance(row, ReportRow) and self.columns == REPORT_COLUMNS:
+                    record = row._asdict() # fields are the columns, in order
+                else:
+                    row = row._asdict() if isinstance(row, ReportRow) else row
+                    unknown = row.keys() - set(self.columns)
+                    if unknown:
+                        raise ValueError(f"Unknown report columns: {sorted(unknown)}")
+                    record = {col: row.get(col) for col in self.columns}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.rows_written += len(rows)
+
+
+def iter_report_rows(jsonl_path: str):
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _format_excel_value(col: str, value):
+    if value is None:
+        return None
+    if col in ("video_id", "user_id"):
+        return str(value)
+    if col == "video_created_time":
+        try:
+            return datetime.fromtimestamp(int(value), timezone.utc).strftime(EXCEL_TIME_FORMAT)
+        except (TypeError, ValueError, OverflowError, OSError):
+            return None
+    if isinstance(value, (list, tuple, set)):
+        return ", ".join(map(str, value))
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def export_excel(jsonl_path: str, xlsx_path: str, columns=None, row_hook=None) -> int:
+    """
+    Render the investigator Excel report from a streamed JSONL file in constant memory.
+
+    Args:
+        jsonl_path: Streamed report rows
+        xlsx_path: Excel file to write
+        columns: Column order. Defaults to REPORT_COLUMNS
+        row_hook: Optional callable(row) -> row applied before writing
+
+    Returns:
+        int: Number of rows written
+    """
+    columns = list(columns or REPORT_COLUMNS)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(columns)
+
+    n_rows = 0
+    if os.path.exists(jsonl_path):
+        for row in iter_report_rows(jsonl_path):
+            if row_hook:
+                row = row_hook(row)
+            sheet.append([_format_excel_value(col, row.get(col)) for col in columns])
+            n_rows += 1
+
+    os.makedirs(os.path.dirname(xlsx_path) or ".", exist_ok=True)
+    workbook.save(xlsx_path)
+    return n_rows
+
+
+def read_report(path: str) -> pd.DataFrame:
+    """
+    Load a report, preferring its JSONL stream over the rendered Excel file.
+
+    Args:
+        path: Path of the report (.xlsx or .jsonl)
+
+    Returns:
+        pd.DataFrame
+    """
+    jsonl_path = path if path.endswith(".jsonl") else jsonl_path_for(path)
+    if not os.path.exists(jsonl_path):
+        return pd.read_excel(path)
+
+    builder = ReportBuilder()
+    builder.append_rows(iter_report_rows(jsonl_path))
+    return builder.to_dataframe()
@@ -3,8 +3,8 @@ import json
 import shutil
 import copy
 from datetime import datetime
-import pandas as pd
 from optimizer import optimize_keywords
+from report_sink import read_report, jsonl_path_for
 import time
 import subprocess   
 
@@ -17,7 +17,7 @@ start_time = time.time()
 
 def compare_excel_reports_json(file1, file2, target, iteration):
     def load_video_ids(path):
-        df = pd.read_excel(path)
+        df = read_report(path)
         return set(df["video_id"].astype(str)) if "video_id" in df.columns else set()
 
     ids1 = load_video_ids(file1)
@@ -71,20 +71,37 @@ def save_json(data, path):
     with open(path, "w", encoding="utf-8") as f:
         f.write(collapsed_text)
 
-def run_scraper(target, iteration, snapshot_dir, report_path):
-    subprocess.run([
-        "python", "tiktok_impersonation_scout.py",
+def run_scraper(target, iteration, snapshot_dir, report_path, target_config_path=None, capture_dir=None, refilter=False):
+    """
+    Run one scan of the target with the scout.
+
+    Args:
+        target_config_path: Target config of this iteration (the optimizer's output)
+        capture_dir: Directory of the raw API response archives of the snapshot
+        refilter: Re-filter the archived responses and scrape only the queries not archived yet
+    """
+    command = [
+        "python", SCRAPER_SCRIPT,
         "--target", target,
         "--iteration", str(iteration),
         "--snapshot-dir", snapshot_dir,
-        "--report-path", report_path  # add this
-    ], check=True)
+        "--report-path", report_path,  # add this
+        "--isolated"  # every iteration filters alike: no seen-video index or profile cache from other runs
+    ]
+    if target_config_path:
+        command += ["--target-config", target_config_path]
+    if capture_dir:
+        command += ["--capture-dir", capture_dir]
+        if refilter:
+            command += ["--replay", capture_dir, "--scrape-missing"]
+    subprocess.run(command, check=True)
 
 
 def main(target, guideline, iterations, skip_scraper=False):
     snapshot_dir = make_snapshot_dir()
     reports_subdir = os.path.join(snapshot_dir, "reports")
     os.makedirs(reports_subdir, exist_ok=True)
+    captures_subdir = os.path.join(snapshot_dir, "captures") # raw API responses, scraped once and re-filtered by later iterations
 
     base_config = load_json(CONFIG_PATH)
     if target not in base_config:
@@ -101,8 +118,9 @@ def main(target, guideline, iterations, skip_scraper=False):
         excel_dst = os.path.join(reports_subdir, f"report{i}.xlsx")
 
         if not skip_scraper:
-            print("🚀 Running scraper...")
-            run_scraper(target, i, snapshot_dir, excel_dst)
+            print("🚀 Running scraper..." if i == 1 else "🚀 Re-filtering cached results (scraping new queries only)...")
+            run_scraper(target, i, snapshot_dir, excel_dst, target_config_path=os.path.join(snapshot_dir, f"snapshot{i}.json"),
+                        capture_dir=captures_subdir, refilter=i > 1)
         else:
             print("⏭️ Skipping scraper as requested...")
             if i == 1:
@@ -111,6 +129,8 @@ def main(target, guideline, iterations, skip_scraper=False):
                 excel_src = os.path.join(reports_subdir, f"report{i - 1}.xlsx")
                 if os.path.exists(excel_src):
                     shutil.copy(excel_src, excel_dst)
+                    if os.path.exists(jsonl_path_for(excel_src)):
+                        shutil.copy(jsonl_path_for(excel_src), jsonl_path_for(excel_dst))
                     print(f"📄 Reusing previous snapshot: {excel_src}")
                 else:
                     raise FileNotFoundError("❌ No Excel report or snapshot to continue iteration.")
@@ -118,7 +138,7 @@ def main(target, guideline, iterations, skip_scraper=False):
         # Run optimizer if more iterations ahead
         if i < iterations:
             print("🧠 Running optimizer...")
-            df = pd.read_excel(excel_dst)
+            df = read_report(excel_dst)
             target_config = optimize_keywords(
                 target=target,
                 guideline=guideline,
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent cross-run index of videos the scout has already processed.
+
+Backed by SQLite and keyed by (target, video_id), with the author indexed
+alongside. Each entry keeps first-seen/last-seen timestamps, whether the
+video passed the target's filters and the keyword groups it matched, so a
+later run can skip filtering, media download and logo classification for the
+videos it already reported. Videos that were not reported are filtered again.
+Entries not seen for ttl_days are expired.
+"""
+import os
+import json
+import time
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_videos (
+    target           TEXT NOT NULL,
+    video_id         TEXT NOT NULL,
+    user_id          TEXT,
+    first_seen       REAL NOT NULL,
+    last_seen        REAL NOT NULL,
+    reported         INTEGER NOT NULL DEFAULT 0,
+    matched_keywords TEXT,
+    PRIMARY KEY (target, video_id)
+);
+CREATE INDEX IF NOT EXISTS idx_seen_videos_user ON seen_videos (user_id);
+CREATE INDEX IF NOT EXISTS idx_seen_videos_last_seen ON seen_videos (last_seen);
+"""
+
+
+class SeenVideoIndex:
+
+    def __init__(self, db_path: str, ttl_days=30):
+        """
+        Args:
+            db_path: SQLite file. Created if missing
+            ttl_days: Expire entries not seen for this many days. None keeps them forever
+        """
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.ttl_days = ttl_days
+        self.run_started_at = time.time()
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def expire(self) -> int:
+        """
+        Delete entries whose last sighting is older than ttl_days.
+
+        Returns:
+            int: Number of expired entries
+        """
+        if self.ttl_days is None:
+            return 0
+        cutoff = time.time() - self.ttl_days * 86400
+        cur = self.conn.execute("DELETE FROM seen_videos WHERE last_seen < ?", (cutoff,))
+        self.conn.commit()
+        return cur.rowcount
+
+    def lookup(self, target: str, video_id: str):
+        """
+        Get a video's entry if it was seen in an earlier run.
+
+        Returns:
+            dict or None: {user_id, first_seen, last_seen, reported, matched_keywords}
+        """
+        row = self.conn.execute("SELECT * FROM seen_videos WHERE target = ? AND video_id = ? AND first_seen < ?",
+                                (target, str(video_id), self.run_started_at)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["reported"] = bool(entry["reported"])
+        entry["matched_keywords"] = json.loads(entry["matched_keywords"]) if entry["matched_keywords"] else []
+        return entry
+
+    def mark_seen(self, target: str, video_id: str, user_id: str, reported=False, matched_keywords=None):
+        """
+        Insert or refresh a video's entry. first_seen is kept; reported is sticky.
+
+        Args:
+            target: Target the video was scanned for
+            video_id: TikTok video ID
+            user_id: Author's unique ID
+            reported: Whether the video passed the target's filters
+            matched_keywords: Keyword groups that matched, if reported
+        """
+        now = time.time()
+        self.conn.execute("""INSERT INTO seen_videos (target, video_id, user_id, first_seen, last_seen, reported, matched_keywords)
+                             VALUES (?, ?, ?, ?, ?, ?, ?)
+                             ON CONFLICT (target, video_id) DO UPDATE SET
+                                 user_id = excluded.user_id,
+                                 last_seen = excluded.last_seen,
+                                 reported = MAX(reported, excluded.reported),
+                                 matched_keywords = COALESCE(excluded.matched_keywords, matched_keywords)""",
+                          (target, str(video_id), str(user_id), now, now, int(reported),
+                           json.dumps(matched_keywords, ensure_ascii=False) if matched_keywords else None))
+
+    def videos_of_user(self, target: str, user_id: str) -> list:
+        """Video IDs already seen for an author."""
+        rows = self.conn.execute("SELECT video_id FROM seen_videos WHERE target = ? AND user_id = ?", (target, str(user_id)))
+        return [row["video_id"] for row in rows]
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Two profile crawls back to back must not see each other's API requests.
+"""
+import json
+
+from perf_log_reader import PerformanceLogReader
+
+ITEM_LIST = "https://www.tiktok.com/api/post/item_list/?secUid={}&cursor={}"
+
+
+class FakeDriver:
+    """Performance log of a browser: get_log drains the events logged so far."""
+
+    def __init__(self):
+        self.pending = []
+
+    def log_request(self, request_id, url, loader_id):
+        message = {"message": {"method": "Network.requestWillBeSent",
+                               "params": {"requestId": request_id, "loaderId": loader_id, "timestamp": 0,
+                                          "request": {"url": url, "headers": {}}}}}
+        self.pending.append({"message": json.dumps(message)})
+
+    def get_log(self, log_type):
+        entries, self.pending = self.pending, []
+        return entries
+
+
+def test_back_to_back_navigations():
+    driver = FakeDriver()
+    reader = PerformanceLogReader()
+
+    reader.start_navigation(driver) # profile A
+    driver.log_request("1000", ITEM_LIST.format("A", 0), "loader-A")
+    reader.poll(driver)
+    assert [captured.request_id for captured in reader.take("^https://www.tiktok.com/api/post/item_list/")] == ["1000"]
+    driver.log_request("1001", ITEM_LIST.format("A", 1), "loader-A") # late request, not taken before leaving A
+
+    reader.start_navigation(driver) # profile B
+    driver.log_request("1002", ITEM_LIST.format("A", 2), "loader-A") # logged after the navigation started
+    driver.log_request("2000", ITEM_LIST.format("B", 0), "loader-B")
+    reader.poll(driver)
+    taken = reader.take("^https://www.tiktok.com/api/post/item_list/")
+    assert [captured.request_id for captured in taken] == ["2000"]
+    assert "secUid=B" in taken[0].url
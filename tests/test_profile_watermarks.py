@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Delta crawls of a profile stop at its high-water mark, and the marks kept per
+target never move backward.
+"""
+from profile_cache import ProfileCache
+from tiktok_scraper import TikTokScraper
+
+AUTHOR = {"id": "42", "uniqueId": "brand", "nickname": "Brand", "signature": ""}
+
+
+def item(video_id, create_time, pinned=False):
+    item = {"id": str(video_id), "desc": "", "createTime": create_time, "video": {},
+            "author": AUTHOR, "authorStats": {}}
+    if pinned:
+        item["isPinnedItem"] = True
+    return item
+
+
+def profile_scraper(pages):
+    """A scraper whose browser serves these item_list pages, newest first; fetched pages are recorded."""
+    scraper = TikTokScraper.__new__(TikTokScraper)
+    scraper.capture_archive = None
+    scraper.fetched = []
+    scraper.navigate_to = lambda url: None
+    scraper.wait_by_xpath = lambda xpath: None
+    scraper._remove_blockers = lambda: None
+
+    def collect_api_pages(url_pattern, max_pages=4, scroll_times=3, stop=None):
+        scraper.fetched = TikTokScraper._until_stop(pages[:max_pages], stop)[0] if stop else pages[:max_pages]
+        return scraper.fetched
+    scraper._collect_api_pages = collect_api_pages
+    return scraper
+
+
+def test_since_stops_at_the_mark():
+    pages = [{"itemList": [item(105, 500), item(104, 400)]},
+             {"itemList": [item(103, 300), item(102, 200)]},
+             {"itemList": [item(101, 100)]}]
+    scraper = profile_scraper(pages)
+
+    profile = scraper.get_profile_info("https://www.tiktok.com/@brand", since={"video_id": "103", "create_time": 300})
+    assert len(scraper.fetched) == 2 # the page holding the mark is the last one fetched
+    assert [video.id for video in profile["videos"]] == ["105", "104"]
+    assert profile["high_water_mark"] == {"video_id": "105", "create_time": 500}
+
+    profile = scraper.get_profile_info("https://www.tiktok.com/@brand")
+    assert len(scraper.fetched) == 3
+    assert len(profile["videos"]) == 5
+
+
+def test_nothing_new_keeps_the_mark():
+    scraper = profile_scraper([{"itemList": [item(103, 300), item(102, 200)]}])
+    since = {"video_id": "103", "create_time": 300}
+
+    profile = scraper.get_profile_info("https://www.tiktok.com/@brand", since=since)
+    assert profile["videos"] == []
+    assert profile["high_water_mark"] == since
+
+
+def test_pinned_old_item_neither_stops_nor_is_returned():
+    pages = [{"itemList": [item(90, 50, pinned=True), item(105, 500)]},
+             {"itemList": [item(104, 400), item(103, 300)]},
+             {"itemList": [item(102, 200)]}]
+    scraper = profile_scraper(pages)
+
+    profile = scraper.get_profile_info("https://www.tiktok.com/@brand", since={"video_id": "103", "create_time": 300})
+    assert len(scraper.fetched) == 2
+    assert [video.id for video in profile["videos"]] == ["105", "104"]
+    assert profile["high_water_mark"] == {"video_id": "105", "create_time": 500}
+
+
+def test_pinned_new_item_does_not_move_the_mark():
+    scraper = profile_scraper([{"itemList": [item(106, 600, pinned=True), item(103, 300)]}])
+    since = {"video_id": "103", "create_time": 300}
+
+    profile = scraper.get_profile_info("https://www.tiktok.com/@brand", since=since)
+    assert [video.id for video in profile["videos"]] == ["106"]
+    assert profile["high_water_mark"] == since
+
+
+def test_common_watermark_is_the_oldest_mark(tmp_path):
+    cache = ProfileCache(db_path=str(tmp_path / "profiles.sqlite3"))
+    assert cache.common_watermark(["A", "B"], "brand") is None
+    assert cache.common_watermark([], "brand") is None
+
+    assert cache.advance_watermark("A", "brand", {"video_id": "105", "create_time": 500})
+    assert cache.common_watermark(["A", "B"], "brand") is None # B would need a full crawl
+    assert cache.advance_watermark("B", "brand", {"video_id": "103", "create_time": 300})
+    cache.close()
+
+    cache = ProfileCache(db_path=str(tmp_path / "profiles.sqlite3"))
+    assert cache.common_watermark(["A", "B"], "brand") == {"video_id": "103", "create_time": 300}
+    assert cache.common_watermark(["A"], "brand") == {"video_id": "105", "create_time": 500}
+    cache.close()
+
+
+def test_advance_watermark_never_moves_backward(tmp_path):
+    cache = ProfileCache(db_path=str(tmp_path / "profiles.sqlite3"))
+    assert cache.watermark("A", "brand") is None
+    assert not cache.advance_watermark("A", "brand", None)
+    assert cache.advance_watermark("A", "brand", {"video_id": "103", "create_time": 300})
+    assert not cache.advance_watermark("A", "brand", {"video_id": "102", "create_time": 200})
+    assert not cache.advance_watermark("A", "brand", {"video_id": "103", "create_time": 300})
+    assert cache.advance_watermark("A", "brand", {"video_id": "105", "create_time": 500})
+    assert cache.watermark("A", "brand") is None # the mark read in this run stays; advances apply to the next run
+    cache.close()
+
+    cache = ProfileCache(db_path=str(tmp_path / "profiles.sqlite3"))
+    assert cache.watermark("A", "brand") == {"video_id": "105", "create_time": 500}
+    assert not cache.advance_watermark("A", "brand", {"video_id": "104", "create_time": 400})
+    cache.close()
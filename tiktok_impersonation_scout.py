@@ -15,7 +15,6 @@ from pprint import pprint
 import pandas as pd
 import time
 import numpy as np
-import re
 from typing import Optional
 import os
 import base64
@@ -26,22 +25,36 @@ import shutil
 import argparse
 from selenium.webdriver.common.by import By
 from http.client import RemoteDisconnected
-import requests
 
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 
-from tiktok_scraper import TikTokScraper
+from tiktok_scraper import TikTokScraper, ReplayScraper
+from keyword_matcher import KeywordGroupMatcher
+from language_detector import ScriptDetector
+from report_sink import ReportSink, export_excel, jsonl_path_for, iter_report_rows
+from seen_video_index import SeenVideoIndex
+from query_planner import QueryPlanner, hashtag_form
+from logo_classifier import LogoClassifier
+from records import ReportRow
+from profile_cache import ProfileCache
 
 ################ settings
 parser = argparse.ArgumentParser(description='TikTok Impersonation Scout')
 
 parser.add_argument('--test', default="N", help="test mode (Y/N)", choices=['Y', 'N'])
-parser.add_argument('--target', required=True, help="Specify which target to scan")
+target_group = parser.add_mutually_exclusive_group(required=True)
+target_group.add_argument('--target', help="Specify which target to scan")
+target_group.add_argument('--targets', help="Scan several targets with one browser session: 'all' or a comma-separated list")
 parser.add_argument('--skip-scraper', action='store_true', help="Skip the scraping process")
 parser.add_argument('--iteration', type=int, help='Iteration number')
 parser.add_argument('--snapshot-dir', type=str, help='Snapshot output directory')
 parser.add_argument('--report-path', type=str, help='Direct path to save the Excel report')
+parser.add_argument('--replay', nargs='+', help="Re-run the filters on capture archives (files, directories or globs) instead of scraping TikTok")
+parser.add_argument('--scrape-missing', action='store_true', help="With --replay, scrape the queries whose searches are not in the archives")
+parser.add_argument('--capture-dir', type=str, help="Archive the raw API responses of this run here (overrides capture_archive_dir)")
+parser.add_argument('--isolated', action='store_true', help="Ignore the seen-video index, profile cache and watermarks on disk")
+parser.add_argument('--target-config', type=str, help="JSON file replacing the --target's entry of the target info config")
 
 args = parser.parse_args()
 
@@ -63,8 +76,11 @@ TARGET_INFO_FILEPATH = CONFIG["target_info_filepath"]
 with open(TARGET_INFO_FILEPATH, "r", encoding="utf-8") as f:
     TARGET_INFO = json.load(f)
     assert TARGET_INFO, "No target info is loaded."
-    import json
-    print(json.dumps(TARGET_INFO, indent=2, ensure_ascii=False))
+if args.target_config: # e.g. the optimized config of a run_full_pipeline iteration
+    assert args.target, "--target-config needs --target"
+    with open(args.target_config, "r", encoding="utf-8") as f:
+        TARGET_INFO[args.target] = json.load(f)
+print(json.dumps(TARGET_INFO, indent=2, ensure_ascii=False))
 
 DOWNLOAD_VIDEOS = False
 DOWNLOADED_VIDEOS_DIR = CONFIG["downloaded_videos_dir"]
@@ -74,11 +90,34 @@ DOWNLOAD_ICONS = False
 DOWNLOADED_ICONS_DIR = CONFIG["downloaded_icons_dir"]
 os.makedirs(DOWNLOADED_ICONS_DIR, exist_ok=True)
 
+# background media downloads: worker threads and size cap per video; icons get a smaller cap
+MEDIA_DOWNLOAD = {"workers": 4, "max_bytes": 200 * 1024 * 1024, **CONFIG.get("media_download", {})}
+ICON_MAX_BYTES = MEDIA_DOWNLOAD.pop("icon_max_bytes", 5 * 1024 * 1024)
+
 REPORTS_DIR = CONFIG["reports_dir"]
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
 MAINTAINER_EMPLOYEEID = CONFIG["MAINTAINER_EMPLOYEEID"]
 LOGO_CLASSIFICATION_API_URL = CONFIG["LOGO_CLASSIFICATION_API_URL"]
+CLASSIFY_LOGOS = CONFIG.get("classify_logos", False) # fill detected_logo_in_profile_icon from the downloaded icons
+logo_classifier = None # created on first use, only when CLASSIFY_LOGOS is set
+
+SEEN_VIDEO_INDEX_PATH = CONFIG.get("seen_video_index_path") # None disables the cross-run index
+SEEN_VIDEO_TTL_DAYS = CONFIG.get("seen_video_ttl_days", 30)
+REPORT_SEEN_VIDEOS = CONFIG.get("report_seen_videos", True) # keep previously reported videos in the report, marked as not new
+
+# API pages fetched per search/profile; a target's "search_depth" overrides these per kind
+SEARCH_DEPTH = {"hashtag": 4, "video": 4, "user": 4, "profile": 11, **CONFIG.get("search_depth", {})}
+seen_video_index = None
+
+PROFILE_CACHE_PATH = CONFIG.get("profile_cache_path") # None keeps crawled profiles in memory for this run only
+PROFILE_CACHE_TTL_HOURS = CONFIG.get("profile_cache_ttl_hours", 24)
+INCREMENTAL_PROFILE_CRAWL = CONFIG.get("incremental_profile_crawl", False) # crawl profiles only down to the last video processed
+
+CAPTURE_ARCHIVE_DIR = args.capture_dir or CONFIG.get("capture_archive_dir") # None disables archiving the raw API responses
+REPLAY = bool(args.replay)
+ISOLATED = args.isolated or REPLAY # leave the persistent seen-video index, profile cache and watermarks untouched
+profile_cache = None
         
 def load_history(history_path: str) -> dict:
     try:
@@ -91,161 +130,206 @@ def save_history(history_path: str, history: dict):
     with open(history_path, "w", encoding="utf-8") as f:
         json.dump(history, f, indent=2, ensure_ascii=False)
 
+script_detector = ScriptDetector()
+
 def contains_language(text: str, language: str) -> bool:
-    patterns = {
-        "英文": r"[A-Za-z]",
-        "中文": r"[\u4e00-\u9fff]",
-        "藏文": r"[\u0F00-\u0FFF]",
-        "泰文": r"[\u0E00-\u0E7F]",
-        "天城文": r"[\u0900-\u097F]",
-        "緬甸文": r"[\u1000-\u109F]",
-        "希臘文": r"[\u0370-\u03FF]",
-        "西里爾文": r"[\u0400-\u04FF]",
-        "希伯來文": r"[\u0590-\u05FF]",
-        "泰米爾文": r"[\u0B80-\u0BFF]",
-        "衣索比亞文": r"[\u1200-\u137F]",
-        "韓文": r"[\uAC00-\uD7AF\u1100-\u11FF]",
-        "日文": r"[\u3040-\u30FF\u31F0-\u31FF\uFF66-\uFF9D]",
-        "阿拉伯文": r"[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]",
-        "越南文": r"[ăâêôơưđĂÂÊÔƠƯĐáàảãạấầẩẫậắằẳẵặéèẻẽẹếềểễệíìỉĩịóòỏõọốồổỗộớờởỡợúùủũụứừửữựýỳỷỹỵ₫]",
-    }
-
-    pattern = patterns.get(language)
-    if not pattern:
-        print(f"[contains_language] Unsupported Language: {language}")
-        return False
-    else:
-        return bool(re.search(pattern, text))
+    script = script_detector.resolve(language)
+    return bool(script) and script_detector.contains_any(text, {script})
     
-def get_new_rows_from_hashtag_search_results(hashtag_search_results: list, download_videos=False, download_icon=False) -> pd.DataFrame:
-    global DOWNLOADED_VIDEOS_DIR, DOWNLOADED_ICONS_DIR, FILENAME_SPLITER, video_url_history, scraper
-    global keywords4risk_estimation, general_keywords2ignore, language2ignore, target, ocr_history, asr_history
+def load_target_context(target_name: str, report_filepath: str) -> dict:
+    """
+    Compile one target's filters and open its report sink.
+
+    Args:
+        target_name: Key in TARGET_INFO
+        report_filepath: Excel report path of the target
+
+    Returns:
+        dict: Per-target scan state shared by the filter functions
+    """
+    target_info = TARGET_INFO[target_name]
+    language2ignore = target_info.get("language2ignore") or target_info.get("languages2ignore", [])
+    return {
+            "target": target_name,
+            "risk_matcher": KeywordGroupMatcher(target_info["keywords4risk_estimation"]),
+            "ignore_matcher": KeywordGroupMatcher(target_info["general_keywords2ignore"]),
+            "scripts2ignore": script_detector.resolve_languages(language2ignore),
+            "language_ratio2ignore": target_info.get("language_ratio2ignore", 0.0),
+            "keywords2search": set(' '.join(kw_lst) for kw_lst in target_info["keywords2search"]),
+            "search_depth": {**SEARCH_DEPTH, **target_info.get("search_depth", {})},
+            "video_url_history": set(),
+            "report_filepath": report_filepath,
+            ### rows are streamed to disk as soon as they are filtered; the Excel file is rendered from them
+            "report_sink": ReportSink(jsonl_path_for(report_filepath))
+            }
+
+def filter_video(target_ctx: dict, video_id: str, user_id: str, video_desc: str) -> tuple:
+    """
+    Apply the target's filters to a video, consulting the cross-run seen-video index first.
+    Only videos already reported in an earlier run skip the filters; the others are
+    filtered again, so changes of the target's keywords or ignore lists apply to them.
+
+    Returns:
+        tuple: (is_new_video, matched_keywords); is_new_video is False for videos reported
+               in an earlier run, matched_keywords is None if the video should not be reported
+    """
+    global seen_video_index
+    target = target_ctx["target"]
+    seen = seen_video_index.lookup(target, video_id) if seen_video_index else None
+    if seen and seen["reported"]:
+        seen_video_index.mark_seen(target, video_id, user_id)
+        return False, (seen["matched_keywords"] if REPORT_SEEN_VIDEOS else None)
+
+    matched_keywords = target_ctx["risk_matcher"].matched_keywords(video_desc)
+    if not matched_keywords:
+        matched_keywords = None
+    elif target_ctx["ignore_matcher"].any_match(video_desc):
+        matched_keywords = None
+    elif script_detector.contains_any(video_desc, target_ctx["scripts2ignore"], min_ratio=target_ctx["language_ratio2ignore"]):
+        matched_keywords = None
+
+    if seen_video_index:
+        seen_video_index.mark_seen(target, video_id, user_id, reported=matched_keywords is not None, matched_keywords=matched_keywords)
+    return True, matched_keywords
+
+def get_new_rows_from_hashtag_search_results(target_ctx: dict, hashtag_search_results: list, download_videos=False, download_icon=False) -> list:
+    global DOWNLOADED_VIDEOS_DIR, DOWNLOADED_ICONS_DIR, FILENAME_SPLITER, scraper
+    global ocr_history, asr_history, seen_video_index
+    video_url_history = target_ctx["video_url_history"]
     new_rows = []
-    for hashtag_result in tqdm(hashtag_search_results, desc="Processing search results"):
+    for video in tqdm(hashtag_search_results, desc="Processing search results"):
         try:
-            video_url = hashtag_result["video"]["share_link"]
+            video_url = video.share_link
             if video_url in video_url_history or video_url == "":
                 continue
             video_url_history.add(video_url)
             
-            video_desc = hashtag_result["video"]["desc"]
-            if not any(all(kw.lower() in video_desc.lower() for kw in kws) for kws in keywords4risk_estimation):
-                continue
-            elif any(all(kw.lower() in video_desc.lower() for kw in kws) for kws in general_keywords2ignore):
-                continue
-            elif any(contains_language(video_desc, language) for language in language2ignore):
+            video_desc = video.desc
+            user_id = video.author.id
+            video_id = video.id
+            is_new_video, matched_keywords = filter_video(target_ctx, video_id, user_id, video_desc)
+            if matched_keywords is None:
                 continue
 
-            user_id = hashtag_result["author"]["id"]
-            video_id = hashtag_result["video"]["id"]
-            new_rows.append({
-                            "target": target, 
-                            # "matched_keywords": {kw for kw in keywords if kw in video_desc}, 
-                            "user_id": user_id, 
-                            "user_nickname": hashtag_result["author"]["nickname"],
-                            "user_signature": hashtag_result["author"]["signature"],
-                            "video_id": video_id,
-                            "video_created_time": hashtag_result["video"]["create_time"],
-                            "video_url": video_url, 
-                            "video_desc": video_desc
-                            })
+            new_rows.append(ReportRow(
+                                    target=target_ctx["target"], 
+                                    matched_keywords=matched_keywords,
+                                    user_id=user_id, 
+                                    user_nickname=video.author.nickname,
+                                    user_signature=video.author.signature,
+                                    video_id=video_id,
+                                    video_created_time=video.create_time,
+                                    video_url=video_url, 
+                                    video_desc=video_desc,
+                                    is_new_video=is_new_video
+                                    ))
+            if not is_new_video:
+                continue # media was handled in an earlier run
 
             video_filename = f"{user_id}{FILENAME_SPLITER}{video_id}"
             if download_videos and (video_filename not in ocr_history or video_filename not in asr_history):
                 headers = {'cookie': scraper.get_tiktok_cookies_formatted()}
-                if not TikTokScraper.save_media(hashtag_result["video"]["download_url"],
-                                                os.path.join(DOWNLOADED_VIDEOS_DIR, video_filename + ".mp4"),
-                                                headers=headers):
-                    print(f"Failed to download video: {video_url = }")
-                # else:
-                    # print(f"Downloaded video: {video_url}")
+                scraper.downloader.enqueue(video.download_url,
+                                           os.path.join(DOWNLOADED_VIDEOS_DIR, video_filename + ".mp4"),
+                                           headers=headers)
             
             downloaded_icon_path = os.path.join(DOWNLOADED_ICONS_DIR, f"{user_id}.png")
             if download_icon and not os.path.exists(downloaded_icon_path):
                 headers = {'cookie': scraper.get_tiktok_cookies_formatted()}
-                icon_img_url = hashtag_result["author"]["icon_img_url_L"] or hashtag_result["author"]["icon_img_url_M"] or hashtag_result["author"]["icon_img_url_S"]
-                if icon_img_url and not TikTokScraper.save_media(icon_img_url, downloaded_icon_path, headers=headers):
-                    print(f"Failed to download icon: {icon_img_url = }")
+                icon_img_url = video.author.icon_img_url
+                if icon_img_url:
+                    scraper.downloader.enqueue(icon_img_url, downloaded_icon_path, headers=headers, max_bytes=ICON_MAX_BYTES)
                     
         except KeyError as ke:
-            print(f"KeyError: {ke}\n{hashtag_result}\n---------")
+            print(f"KeyError: {ke}\n{video}\n---------")
             continue
 
         except Exception as e:
             print(f"Exception: {e}")
             continue
 
-    return pd.DataFrame(new_rows)
+    if seen_video_index:
+        seen_video_index.commit()
+    return new_rows
+
+def get_new_rows_from_video_search_results(target_ctx: dict, video_search_results: list, download_videos=False, download_icon=False) -> list:
+    return get_new_rows_from_hashtag_search_results(target_ctx, video_search_results, download_videos=download_videos, download_icon=download_icon)
 
-def get_new_rows_from_video_search_results(video_search_results: list, download_videos=False, download_icon=False) -> pd.DataFrame:
-    return get_new_rows_from_hashtag_search_results(video_search_results, download_videos=download_videos, download_icon=download_icon)
+def get_logo_classifier() -> LogoClassifier:
+    global logo_classifier
+    if logo_classifier is None:
+        logo_classifier = LogoClassifier(LOGO_CLASSIFICATION_API_URL, cache_path=CONFIG.get("logo_cache_path"),
+                                         workers=CONFIG.get("logo_classifier_workers", 4))
+    return logo_classifier
 
 def logo_classify(image_path: str):
-    global LOGO_CLASSIFICATION_API_URL
     try:
-        files = {"file": open(image_path, "rb")}
-        response = requests.post(LOGO_CLASSIFICATION_API_URL, files=files)
-        response.raise_for_status()
-        result = response.json()["recognition_result"]
-        return result["pred_class_name"].split('#')[0] if result["class_prob"] > 0.999999 else ''
-        
-    except requests.exceptions.HTTPError as e:
-        print(f"[logo_classify] {e.response.status_code = }")
-        return
-        
-    except Exception as e:
+        return get_logo_classifier().classify(image_path)
+    except OSError as e:
         print(f"[logo_classify] {e}")
         return
+
+def detect_logos_in_report(jsonl_path: str) -> dict:
+    """
+    Classify the downloaded profile icons of every user in a streamed report (cached, concurrent).
+
+    Returns:
+        dict: {user_id: detected logo ('' if none, None if classification failed)}
+    """
+    global DOWNLOADED_ICONS_DIR
+    icon_paths = {}
+    for row in iter_report_rows(jsonl_path):
+        icon_path = os.path.join(DOWNLOADED_ICONS_DIR, f"{row['user_id']}.png")
+        if os.path.exists(icon_path):
+            icon_paths[str(row["user_id"])] = icon_path
+    labels = get_logo_classifier().classify_many(icon_paths.values())
+    return {user_id: labels.get(icon_path) for user_id, icon_path in icon_paths.items()}
         
-def get_new_rows_from_profile_info(profile_info: dict, download_videos=False, download_icon=False) -> pd.DataFrame:
-    global DOWNLOADED_VIDEOS_DIR, DOWNLOADED_ICONS_DIR, FILENAME_SPLITER, video_url_history, scraper
-    global keywords4risk_estimation, general_keywords2ignore, language2ignore, target, ocr_history, asr_history
+def get_new_rows_from_profile_info(target_ctx: dict, profile_info: dict, download_videos=False, download_icon=False) -> list:
+    global DOWNLOADED_VIDEOS_DIR, DOWNLOADED_ICONS_DIR, FILENAME_SPLITER, scraper
+    global ocr_history, asr_history, seen_video_index
+    video_url_history = target_ctx["video_url_history"]
     
     user_id = profile_info["unique_id"]
     if download_icon:
-        if not TikTokScraper.save_media(profile_info["icon_img_url"], os.path.join(DOWNLOADED_ICONS_DIR, f"{user_id}.png")):
-            print(f"Failed to download icon: {profile_info['icon_img_url']}")
+        scraper.downloader.enqueue(profile_info["icon_img_url"], os.path.join(DOWNLOADED_ICONS_DIR, f"{user_id}.png"), max_bytes=ICON_MAX_BYTES)
 
     new_rows = []
     for video in tqdm(profile_info["videos"], desc=f"Scraping {user_id}'s videos"):
         try:
-            video_url = video["share_link"]
+            video_url = video.share_link
             if video_url in video_url_history:
                 continue
             video_url_history.add(video_url)
 
-            video_id = video["id"]
-            video_desc = video["desc"]
+            video_id = video.id
+            video_desc = video.desc
 
-            if not any(all(kw.lower() in video_desc.lower() for kw in kws) for kws in keywords4risk_estimation):
-                continue
-            elif any(all(kw.lower() in video_desc.lower() for kw in kws) for kws in general_keywords2ignore):
-                continue
-            elif any(contains_language(video_desc, language) for language in language2ignore):
+            is_new_video, matched_keywords = filter_video(target_ctx, video_id, user_id, video_desc)
+            if matched_keywords is None:
                 continue
                 
-            new_rows.append({
-                                "target": target, 
-                                # "matched_keywords": {kw for kw in keywords if kw in video_desc}, 
-                                "user_id": user_id, 
-                                "user_nickname": profile_info["nickname"],
-                                "user_signature": profile_info["signature"],
-                                "video_id": video_id, 
-                                "video_created_time": video["create_time"],
-                                "video_url": video_url, 
-                                "video_desc": video_desc
-                                })
+            new_rows.append(ReportRow(
+                                    target=target_ctx["target"], 
+                                    matched_keywords=matched_keywords,
+                                    user_id=user_id, 
+                                    user_nickname=profile_info["nickname"],
+                                    user_signature=profile_info["signature"],
+                                    video_id=video_id, 
+                                    video_created_time=video.create_time,
+                                    video_url=video_url, 
+                                    video_desc=video_desc,
+                                    is_new_video=is_new_video
+                                    ))
+            if not is_new_video:
+                continue # media was handled in an earlier run
             
             filename = f"{user_id}{FILENAME_SPLITER}{video_id}"
             if download_videos and (filename not in ocr_history or filename not in asr_history):
                 headers = {'cookie': scraper.get_tiktok_cookies_formatted()}
-                if not TikTokScraper.save_media(video["download_url"],
-                                                os.path.join(DOWNLOADED_VIDEOS_DIR, filename + ".mp4"),
-                                                headers=headers):
-                    print(f"Failed to download video: {video_url}")
-                    print(f"{video = }")
-                # else:
-                    # print(f"Downloaded video: {video_url}")
+                scraper.downloader.enqueue(video.download_url,
+                                           os.path.join(DOWNLOADED_VIDEOS_DIR, filename + ".mp4"),
+                                           headers=headers)
 
         except KeyError as ke:
             print(f"KeyError: {ke}\n{video}\n---------")
@@ -254,7 +338,10 @@ def get_new_rows_from_profile_info(profile_info: dict, download_videos=False, do
         except Exception as e:
             print(f"Exception: {e}")
             break
-    return pd.DataFrame(new_rows)
+
+    if seen_video_index:
+        seen_video_index.commit()
+    return new_rows
 
 def time_convertion_string(s: int) -> str:
     if s < 0:
@@ -270,6 +357,112 @@ def time_convertion_string(s: int) -> str:
 
     return ' '.join(result)
 
+def bootstrap_session(scraper: TikTokScraper):
+    """Launch the browser and load the TikTok session cookies once."""
+    scraper.activate_webdriver(vm_mode=True, user_agent=CONFIG["user_agent"])
+    scraper.navigate_to("https://www.tiktok.com/")
+    for cookie in cookies:
+        scraper.driver.add_cookie({
+                                    'name': cookie['name'],
+                                    'value': cookie['value'],
+                                    'domain': cookie['domain'],
+                                    'path': cookie['path'],
+                                    'secure': cookie.get('secure', False),
+                                    'httpOnly': cookie.get('httpOnly', False)
+                                    })
+    scraper.driver.refresh()
+    scraper.invalidate_cookies()
+    scraper.wait_for_page_ready(timeout=3)
+    print("start.png saved.")
+
+def fetch_profile_info(scraper: TikTokScraper, user_id: str, max_pages: int, targets: list) -> dict:
+    """
+    Get a user's profile from the profile cache, crawling it only on a miss.
+    With INCREMENTAL_PROFILE_CRAWL, once every target in targets holds a
+    high-water mark for the user, the crawl stops at the oldest of them and the
+    profile holds only the videos newer than it (cached for this run only).
+    """
+    global profile_cache
+    since = profile_cache.common_watermark(targets, user_id) if INCREMENTAL_PROFILE_CRAWL else None
+    # profiles cached by earlier runs were never archived by this one: crawl them so that a replay sees them
+    profile_info = profile_cache.get(user_id, max_pages, memory_only=scraper.capture_archive is not None, since=since)
+    if profile_info is not None:
+        return profile_info
+
+    profile_url = "https://www.tiktok.com/@"+user_id
+    try:
+        profile_info = scraper.get_profile_info(profile_url, max_pages=max_pages, since=since)
+    except (ConnectionResetError, ConnectionError, RemoteDisconnected) as cre:
+        print(f"Failed to get profile info due to {cre} ({profile_url = })\nretry after 10 seconds...")
+        time.sleep(10)
+        profile_info = scraper.get_profile_info(profile_url, max_pages=max_pages, since=since)
+    if since:
+        print(f"{user_id}: {len(profile_info['videos'])} video(s) since {since['video_id']}")
+    if profile_info.get("id"):
+        profile_cache.put(user_id, profile_info, max_pages, since=since)
+    return profile_info
+
+def scan_query(scraper: TikTokScraper, query: str, planner: QueryPlanner, target_ctxs: dict, searched_hashtags: set):
+    """
+    Run the hashtag, video and user searches of one planned query once, and fan
+    every result page out to the filters of each interested target.
+    """
+    interested = [target_ctxs[name] for name in sorted(planner.targets_for(query))]
+    depth = lambda kind, ctxs: max(target_ctx["search_depth"][kind] for target_ctx in ctxs) # deepest interested target wins
+
+    ### hashatg search result (shared by every keyword with the same hashtag form)
+    hashtag = hashtag_form(query)
+    if hashtag not in searched_hashtags:
+        hashtag_ctxs = [target_ctxs[name] for name in sorted(planner.hashtag_queries()[hashtag])]
+        scraper.capture_tags = {"targets": [target_ctx["target"] for target_ctx in hashtag_ctxs]}
+        print(f"Searching for hashtag by \"{hashtag}\" in TikTok...")
+        hashtag_search_results = scraper.get_hashtag_search_results(hashtag, max_pages=depth("hashtag", hashtag_ctxs))
+        if not hashtag_search_results:
+            print("No hashtag results. retrying...")
+            hashtag_search_results = scraper.get_hashtag_search_results(query, max_pages=depth("hashtag", hashtag_ctxs))
+        for target_ctx in hashtag_ctxs:
+            target_ctx["report_sink"].append_rows(get_new_rows_from_hashtag_search_results(target_ctx, hashtag_search_results, download_videos=DOWNLOAD_VIDEOS, download_icon=DOWNLOAD_ICONS))
+        searched_hashtags.add(hashtag)
+
+    ### video search result
+    scraper.capture_tags = {"targets": [target_ctx["target"] for target_ctx in interested]}
+    print(f"Searching for video by \"{query}\" in TikTok...")
+    video_search_results = scraper.get_video_search_results(query, max_pages=depth("video", interested))
+    if not video_search_results:
+        print("No video results. retrying...")
+        video_search_results = scraper.get_video_search_results(query, max_pages=depth("video", interested))
+    for target_ctx in interested:
+        target_ctx["report_sink"].append_rows(get_new_rows_from_video_search_results(target_ctx, video_search_results, download_videos=DOWNLOAD_VIDEOS, download_icon=DOWNLOAD_ICONS))
+    
+    if TEST_MODE: return
+    
+    ### user search result
+    print(f"Searching for user by \"{query}\" in TikTok...")
+    user_search_results = scraper.get_user_search_results(query, max_pages=depth("user", interested))
+    for user_info in user_search_results:
+        user_desc = user_info["nickname"]+':'+user_info["signature"]
+        matching = [target_ctx for target_ctx in interested if target_ctx["risk_matcher"].any_match(user_desc)]
+        if not matching:
+            continue
+        user_id = user_info["unique_id"]
+        scraper.capture_tags = {"targets": [target_ctx["target"] for target_ctx in matching]}
+        profile_info = fetch_profile_info(scraper, user_id, depth("profile", matching), [target_ctx["target"] for target_ctx in matching])
+        if not profile_info.get("videos"):
+            print(f"{user_id} has no video.")
+            #print(f"{profile_info = }")
+            continue
+        for target_ctx in matching:
+            target_ctx["report_sink"].append_rows(get_new_rows_from_profile_info(target_ctx, profile_info, download_videos=DOWNLOAD_VIDEOS, download_icon=DOWNLOAD_ICONS))
+        if INCREMENTAL_PROFILE_CRAWL: # only once its videos are in the reports
+            for target_ctx in matching:
+                profile_cache.advance_watermark(target_ctx["target"], user_id, profile_info.get("high_water_mark"))
+
+def resolve_targets(targets_arg: str) -> list:
+    """'all' means every target whose status is 'detecting' (or has no status)."""
+    if targets_arg.strip().lower() == "all":
+        return [name for name, info in TARGET_INFO.items() if isinstance(info, dict) and info.get("status", "detecting") == "detecting"]
+    return [name.strip() for name in targets_arg.split(',') if name.strip()]
+
 if not SKIP_SCRAPER:
     if __name__ == "__main__":
     ###initializes
@@ -278,116 +471,119 @@ if not SKIP_SCRAPER:
         
         snapshot_dir = args.snapshot_dir
 
-        report_filename = f"report{args.iteration}.xlsx"
-        report_filepath = os.path.join(args.snapshot_dir, "reports", report_filename)
+        ### report path of each target
+        reports_dir = os.path.join(args.snapshot_dir, "reports") if args.snapshot_dir else REPORTS_DIR
+        if args.target:
+            report_filepath = args.report_path or (os.path.join(reports_dir, f"report{args.iteration}.xlsx") if args.snapshot_dir
+                                                   else os.path.join(reports_dir, f"target2detect_{today}_{args.target}.xlsx"))
+            report_filepaths = {args.target: report_filepath}
+        else:
+            report_filepaths = {name: os.path.join(reports_dir, f"target2detect_{today}_{name}.xlsx") for name in resolve_targets(args.targets)}
+        print(f"Targets to scan: {list(report_filepaths)}")
         
-        scraper = TikTokScraper()
+        scraper_options = dict(http_options=CONFIG.get("http_session"), replay_workers=CONFIG.get("replay_workers", 8),
+                               cdp_bodies=CONFIG.get("cdp_response_bodies", True), body_timeout=CONFIG.get("cdp_body_timeout", 3), cookie_ttl=CONFIG.get("cookie_ttl", 60),
+                               blocker_xpaths=CONFIG.get("blocker_xpaths"), captcha_corpus_dir=CONFIG.get("captcha_corpus_dir"),
+                               download_options=MEDIA_DOWNLOAD)
+        capture_path = os.path.join(CAPTURE_ARCHIVE_DIR, f"capture_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl.gz") if CAPTURE_ARCHIVE_DIR else None
+        if REPLAY:
+            scraper = ReplayScraper(args.replay, live=args.scrape_missing, capture_path=capture_path if args.scrape_missing else None, **scraper_options)
+            print(f"Replaying {len(scraper.captures)} archived endpoint calls from {args.replay}")
+        else:
+            scraper = TikTokScraper(capture_path=capture_path, **scraper_options)
         ocr_history = {}
         asr_history = {}
 
-        max_report_len = 0
-        for retry_iter in range(2):
+        if SEEN_VIDEO_INDEX_PATH and not ISOLATED:
+            seen_video_index = SeenVideoIndex(SEEN_VIDEO_INDEX_PATH, ttl_days=SEEN_VIDEO_TTL_DAYS)
+            print(f"{seen_video_index.expire()} expired entries removed from the seen-video index.")
+        profile_cache = ProfileCache(None if ISOLATED else PROFILE_CACHE_PATH, ttl_hours=PROFILE_CACHE_TTL_HOURS)
+        profile_cache.expire()
+
+        ### plan every distinct search once across all targets
+        target_ctxs = {}
+        failed_targets = []
+        for target, report_filepath in report_filepaths.items():
+            if target not in TARGET_INFO:
+                print(f"⚠️ Target '{target}' not found in target_info config.")
+                failed_targets.append(target)
+                continue
             try:
-                scraper.activate_webdriver(vm_mode=True, user_agent=CONFIG["user_agent"])
-                report = pd.DataFrame(columns=["target", "matched_keywords", 
-                                                "user_id", "user_nickname", "user_signature", 
-                                                "video_id", "video_created_time", "video_url", "video_desc",
-                                                "video_OCR", "video_ASR", "detected_logo_in_profile_icon", "risk_level"])
-                
-                ### load cookies
-                scraper.navigate_to("https://www.tiktok.com/")
-                for cookie in cookies:
-                    scraper.driver.add_cookie({
-                                                'name': cookie['name'],
-                                                'value': cookie['value'],
-                                                'domain': cookie['domain'],
-                                                'path': cookie['path'],
-                                                'secure': cookie.get('secure', False),
-                                                'httpOnly': cookie.get('httpOnly', False)
-                                                })
-                scraper.driver.refresh()
-                time.sleep(3)
-                print("start.png saved.")
-                
-                ### scraping tiktok
-                if target not in TARGET_INFO:
-                    raise ValueError(f"Target '{target}' not found in target_info config.")
-
-                keywords4risk_estimation = TARGET_INFO[target]["keywords4risk_estimation"]
-                general_keywords2ignore = TARGET_INFO[target]["general_keywords2ignore"]
-                language2ignore = TARGET_INFO[target].get("language2ignore") or TARGET_INFO[target].get("languages2ignore", [])
-                keywords2search = set(' '.join(kw_lst) for kw_lst in TARGET_INFO[target]["keywords2search"])
-                print(f"{keywords2search = }")
-                video_url_history = set()
-                for keyword in keywords2search:
-
-                    ### hashatg search result
-                    print(f"Searching for hashtag by \"{keyword.replace(' ','')}\" in TikTok...")
-                    hashtag_search_results = scraper.get_hashtag_search_results(keyword.replace(' ',''))
-                    if not hashtag_search_results:
-                        print("No hashtag results. retrying...")
-                        hashtag_search_results = scraper.get_hashtag_search_results(keyword)
-                    new_rows_h = get_new_rows_from_hashtag_search_results(hashtag_search_results, download_videos=DOWNLOAD_VIDEOS, download_icon=DOWNLOAD_ICONS)
-
-                    ### video search result
-                    print(f"Searching for video by \"{keyword}\" in TikTok...")
-                    video_search_results = scraper.get_video_search_results(keyword)
-                    if not video_search_results:
-                        print("No video results. retrying...")
-                        video_search_results = scraper.get_video_search_results(keyword)
-                    new_rows_v = get_new_rows_from_video_search_results(video_search_results, download_videos=DOWNLOAD_VIDEOS, download_icon=DOWNLOAD_ICONS)
-
-                    report = pd.concat([report, new_rows_h, new_rows_v], ignore_index=True)
-                    
-                    if TEST_MODE: break
+                target_ctxs[target] = load_target_context(target, report_filepath)
+            except Exception as e:
+                print(f"[{target}] Failed to load the target context:", type(e).__name__, ':', str(e))
+                failed_targets.append(target)
+        planner = QueryPlanner()
+        for target, target_ctx in target_ctxs.items():
+            planner.add_target(target, target_ctx["keywords2search"])
+        print(f"Planned queries: {planner.keywords()}")
+
+        ### one browser session and one cookie bootstrap for all targets; failures are isolated per query
+        searched_hashtags = set()
+        for query in planner.keywords():
+            for retry_iter in range(2):
+                try:
+                    if REPLAY and not scraper.select_query(query):
+                        print(f"\"{query}\" is not in the archives; scraping it.")
+                    if scraper.driver is None and not (REPLAY and scraper.offline):
+                        bootstrap_session(scraper)
+                    scan_query(scraper, query, planner, target_ctxs, searched_hashtags)
+                    break
                     
-                    ### user search result
-                    print(f"Searching for user by \"{keyword}\" in TikTok...")
-                    user_search_results = scraper.get_user_search_results(keyword)
-                    for user_info in user_search_results:
-                        user_desc = user_info["nickname"]+':'+user_info["signature"]
-                        if not any(all(kw.lower() in user_desc.lower() for kw in kws) for kws in keywords4risk_estimation):
-                            continue
-                        user_id = user_info["unique_id"]
-                        profile_url = "https://www.tiktok.com/@"+user_id
+                except Exception as e:
+                    print(f"[{query}]", type(e).__name__, ':', str(e))
+                    if scraper.driver:
                         try:
-                            profile_info = scraper.get_profile_info(profile_url)
-                        except (ConnectionResetError, ConnectionError, RemoteDisconnected) as cre:
-                            print(f"Failed to get profile info due to {cre} ({profile_url = })\nretry after 10 seconds...")
-                            time.sleep(10)
-                            profile_info = scraper.get_profile_info(profile_url)
-                        if not profile_info.get("videos"):
-                            print(f"{user_id} has no video.")
-                            #print(f"{profile_info = }")
-                            continue
-                        new_rows_p = get_new_rows_from_profile_info(profile_info, download_videos=DOWNLOAD_VIDEOS, download_icon=DOWNLOAD_ICONS)
-                        report = pd.concat([report, new_rows_p], ignore_index=True)
-                if TEST_MODE:
-                    break
+                            with open("err_html.html", 'w', encoding="utf-8") as f:
+                                f.write(scraper.driver.page_source)
+                        except Exception as dump_error:
+                            print(f"Failed to save err_html.html: {dump_error}")
+                        scraper.close_webdriver() # restart the browser before retrying
+            else:
+                failed_targets += [target for target in planner.targets_for(query) if target not in failed_targets]
+            if TEST_MODE:
                 break
-                
-            except Exception as e:
-                print(type(e).__name__, ':', str(e))
-                with open("err_html.html", 'w', encoding="utf-8") as f:
-                    f.write(scraper.driver.page_source)
-                    
-            finally:
-                if 'report' not in locals():
-                    report = pd.DataFrame(columns=["target", "matched_keywords", 
-                                                "user_id", "user_nickname", "user_signature", 
-                                                "video_id", "video_created_time", "video_url", "video_desc",
-                                                "video_OCR", "video_ASR", "detected_logo_in_profile_icon", "risk_level"])
-                
-                report["video_id"] = report["video_id"].astype(str)
-                report["user_id"] = report["user_id"].astype(str)
-                report["video_created_time"] = pd.to_datetime(report["video_created_time"], unit='s', errors='coerce')
-                report["video_created_time"] = report["video_created_time"].dt.strftime("%Y%m%d %H:%M")
-
-                os.makedirs(os.path.dirname(report_filepath), exist_ok=True)
-                print(f"📁 Saving report to: {report_filepath}")
-                report.to_excel(report_filepath, index=False)
-                scraper.close_webdriver()
-                print(f"⏱️ Total time: {time.time() - start_time:.2f} sec")
+
+        scraper.downloader.close() # wait for the queued media downloads
+        print(f"🎞️ Media downloads: {scraper.downloader.stats}")
+        for url, file_path, reason in scraper.downloader.failures:
+            print(f"Failed to download {url} -> {file_path}: {reason}")
+
+        for target, target_ctx in target_ctxs.items():
+            report_filepath = target_ctx["report_filepath"]
+            report_sink = target_ctx["report_sink"]
+            row_hook = None
+            if CLASSIFY_LOGOS and os.path.exists(report_sink.path):
+                logos = detect_logos_in_report(report_sink.path)
+                row_hook = lambda row, logos=logos: dict(row, detected_logo_in_profile_icon=logos.get(str(row["user_id"])) or None)
+            print(f"📁 Saving report to: {report_filepath} ({len(report_sink)} rows streamed to {report_sink.path})")
+            export_excel(report_sink.path, report_filepath, row_hook=row_hook)
+
+        summary = planner.summary()
+        print(f"🔎 Searches planned: {summary['total']['planned']} of {summary['total']['requested']} requested ({summary['total']['saved']} saved by deduplication)")
+        print(json.dumps(summary, indent=2))
+
+        if scraper.driver:
+            scraper.close_webdriver()
+        if seen_video_index:
+            seen_video_index.close()
+        if scraper.capture_archive:
+            scraper.capture_archive.close()
+            print(f"🗄️ Capture archive: {scraper.capture_archive.stats} -> {scraper.capture_archive.path}")
+        if REPLAY:
+            print(f"🔁 Replay: {scraper.replay_stats}")
+        print(f"👤 Profile cache: {profile_cache.stats}")
+        profile_cache.close()
+        print(f"🔌 HTTP pool stats: {json.dumps(scraper.http.pool_stats(), indent=2)}")
+        if logo_classifier is not None:
+            print(f"🏷️ Logo classification: {logo_classifier.stats}")
+            logo_classifier.close()
+        print(f"🧹 Blocker sweeps: {json.dumps(scraper.blocker_stats, indent=2, ensure_ascii=False)}")
+        print(f"⏱️ Waits: {json.dumps(scraper.wait_summary(), indent=2)}")
+        print(f"📥 API bodies: {scraper.body_stats['cdp']} read from the browser, {scraper.body_stats['replayed']} replayed")
+        if failed_targets:
+            print(f"⚠️ Targets with failed or missing scans: {failed_targets}")
+        print(f"⏱️ Total time: {time.time() - start_time:.2f} sec")
 
   
     
@@ -5,46 +5,147 @@ Created on Fri Jan  3 14:25:52 2025
 @author: PikasZhuang
 """
 
-import os
 import re
 import time
 import json
 import base64
-import requests
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from web_scraper import WebScraper
-from urllib.parse import quote
+from http_session import HttpSessionManager
+from media_downloader import MediaDownloader
+from perf_log_reader import PerformanceLogReader
+from captcha_solver import decode_image, solve_rotation
+from captcha_harness import save_corpus_case
+from capture_archive import CaptureArchive, load_captures
+from item_parser import parse_json, normalize_item, normalize_video, normalize_profile_author, normalize_user
+from urllib.parse import quote, urlparse
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import cv2
-import numpy as np
 from functools import wraps
 
+# query parameter carrying the page cursor of each paginated endpoint (default: "cursor")
+ENDPOINT_CURSOR_PARAMS = {
+    "/api/search/item/full": "offset",
+}
+DEFAULT_MAX_PAGES = 4
+PREFETCH_BATCH = 2 # offset-cursor pages requested concurrently before checking hasMore again
+
+# overlays dismissed before and after every scraping call (overridable by the "blocker_xpaths" config)
+DEFAULT_BLOCKER_XPATHS = [
+    '//span[@data-e2e="launch-popup-close"]',
+    '//button[@class="tux-base-dialog__close-button"]',
+    '//div[@role="button"][@aria-label="關閉"]',
+    '//div[contains(@class, "DivGuestModeContainer")]',
+    "//div[text()='以訪客身分繼續']",
+]
+CAPTCHA_XPATH = "//img[@alt='Captcha']"
+
+# clicks every blocker in one round-trip; returns {"hits": [clicks per xpath], "captcha": number of captcha images}
+BLOCKER_SWEEP_JS = """
+    const xpaths = arguments[0];
+    const hits = xpaths.map(xpath => {
+        const found = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        let clicked = 0;
+        for (let i = 0; i < found.snapshotLength; i++) {
+            try { found.snapshotItem(i).click(); clicked++; } catch (e) {}
+        }
+        return clicked;
+    });
+    const captcha = document.evaluate("count(" + arguments[1] + ")", document, null, XPathResult.NUMBER_TYPE, null).numberValue;
+    return {hits: hits, captcha: captcha};
+"""
+
 class TikTokScraper(WebScraper):
 
-    def __init__(self, wait_time=3):
+    def __init__(self, wait_time=3, http_options=None, replay_workers=8, per_host_limit=6, cdp_bodies=True, body_timeout=3, cookie_ttl=60,
+                 blocker_xpaths=None, captcha_corpus_dir=None, download_options=None, capture_path=None):
+        """
+        Args:
+            wait_time: Seconds to wait after navigating to the homepage
+            http_options: Keyword arguments of HttpSessionManager (pool size, timeout, retries)
+            replay_workers: Threads replaying captured API URLs concurrently
+            per_host_limit: Maximum concurrent replays against one host
+            cdp_bodies: Read API response bodies from the browser (CDP) before replaying the request
+            body_timeout: Seconds to wait for the browser to finish loading those bodies before replaying
+            cookie_ttl: Seconds the cached cookie header is reused without asking the browser
+            blocker_xpaths: XPaths of the overlays to dismiss. Defaults to DEFAULT_BLOCKER_XPATHS
+            captcha_corpus_dir: Save every rotation captcha met (with the answer and whether it passed) here for captcha_harness.py
+            download_options: Keyword arguments of MediaDownloader (workers, size cap)
+            capture_path: Append the raw response pages of every endpoint call to this .jsonl.gz archive
+        """
         super().__init__()
         self.BASE_URL = "https://www.tiktok.com/"
         self.WAIT_TIME = wait_time
+        self.http = HttpSessionManager(**(http_options or {}))
+        self.downloader = MediaDownloader(self.http, **(download_options or {}))
+        self.replay_workers = replay_workers
+        self.per_host_limit = per_host_limit
+        self._host_semaphores = {}
+        self._host_semaphores_lock = threading.Lock()
+        self.last_replay_timings = [] # [{"url", "seconds", "ok"}] of the latest _fetch_api_urls call
+        self.log_reader = PerformanceLogReader()
+        self.last_captured_requests = [] # CapturedRequest (with CDP requestId) of the latest log lookup
+        self.cdp_bodies = cdp_bodies
+        self.body_timeout = body_timeout
+        self.body_stats = {"cdp": 0, "replayed": 0}
+        self.cookie_ttl = cookie_ttl
+        self._cookie_header = None
+        self._cookie_fetched_at = 0
+        self._cookie_change_mark = 0
+        self.blocker_xpaths = list(blocker_xpaths or DEFAULT_BLOCKER_XPATHS)
+        self.blocker_stats = {"sweeps": 0, "seconds": 0.0, "captchas": 0, "hits": {xpath: 0 for xpath in self.blocker_xpaths}}
+        self.last_blocker_sweep = None
+        self.captcha_corpus_dir = captcha_corpus_dir
+        self.capture_archive = CaptureArchive(capture_path) if capture_path else None
+        self.capture_tags = {} # extra fields of the archived records, e.g. {"targets": [...]}
+    
+    def activate_webdriver(self, *args, **kwargs):
+        super().activate_webdriver(*args, **kwargs)
+        self.invalidate_cookies()
+    
+    def navigate_to(self, url: str):
+        self.log_reader.start_navigation(self.driver) # API requests of the previous page must not be taken for this one
+        super().navigate_to(url)
+        self.invalidate_cookies()
+    
+    def invalidate_cookies(self):
+        """Drop the cached cookie header; the next get_tiktok_cookies_formatted asks the browser again."""
+        self._cookie_header = None
     
     def get_tiktok_cookies_formatted(self) -> str:
         """
         Get TikTok cookies formatted as a single string.
         
+        The header is cached and only re-read from the browser after a navigation,
+        a captcha solve, a logged Set-Cookie changing a tracked cookie (ttwid, msToken...),
+        or once cookie_ttl expires.
+        
         Returns:
             Formatted cookie string in the format:
             'msToken=value; ttwid=value; ...'
         """
+        if (self._cookie_header is not None
+            and time.time() - self._cookie_fetched_at < self.cookie_ttl
+            and self.log_reader.cookie_changes == self._cookie_change_mark):
+            return self._cookie_header
+        
         if not self.driver.current_url.startswith(self.BASE_URL):
             self.navigate_to(self.BASE_URL)
-            time.sleep(self.WAIT_TIME)
+            self.wait_for_page_ready(timeout=self.WAIT_TIME)
         
         cookies = self.driver.get_cookies()
-        return "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in cookies)
+        self.http.sync_cookies(cookies)
+        self._cookie_header = "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in cookies)
+        self._cookie_fetched_at = time.time()
+        self._cookie_change_mark = self.log_reader.cookie_changes
+        return self._cookie_header
     
-    @staticmethod
-    def save_media(url: str, file_path: str, headers=None) -> bool:
+    def save_media(self, url: str, file_path: str, headers=None) -> bool:
         """
-        Download and save media from a URL.
+        Download and save media from a URL (streamed, resumable, size-capped; see MediaDownloader).
+        Use self.downloader.enqueue to download in the background instead.
         
         Args:
             url: URL of the media to download
@@ -54,18 +155,10 @@ class TikTokScraper(WebScraper):
         Returns:
             bool: True if successful, False otherwise
         """
-        headers = headers or {}
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, "wb") as file:
-                file.write(response.content)
+        if self.downloader.download(url, file_path, headers=headers):
             return True
-        except Exception as e:
-            print(f"Failed to save media: {e}")
-            return False
+        print(f"Failed to save media: {self.downloader.failures[-1][2]}")
+        return False
     
     @staticmethod
     def save_json(to_save, file_path: str):
@@ -83,6 +176,7 @@ class TikTokScraper(WebScraper):
     def _find_api_urls_and_headers_from_log(self, url_pattern='.*'):
         """
         Helper function to extract API URLs and headers from the browser log.
+        Only requests captured since the previous call are returned.
         
         Args:
             url_pattern: Regex pattern to match URLs. Defaults to '.*' to match any URL.
@@ -90,77 +184,295 @@ class TikTokScraper(WebScraper):
         Returns:
             tuple: (list of matching URLs, dict of headers from the last matching request)
         """
-        logs = self.driver.get_log('performance')
-        api_urls = []
-        headers = {}
+        self.log_reader.poll(self.driver)
+        captured = self.log_reader.take(url_pattern)
+        self.last_captured_requests = captured
+        api_urls = [request.url for request in captured]
+        headers = captured[-1].headers if captured else {}
+        return api_urls, headers
+    
+    def _wait_for_api_urls(self, url_pattern: str, timeout=5, poll_interval=0.2):
+        """
+        Poll the browser log until at least one request matching url_pattern is captured.
         
-        for entry in logs:
-            try:
-                log = json.loads(entry['message'])
-                message = log['message']['params']
-                if 'request' in message:
-                    request = message['request']
-                    url = request.get('url', '')
-                    if re.match(url_pattern, url):
-                        headers = request.get('headers', {})
-                        api_urls.append(url)
-            except:
-                continue
+        Returns:
+            tuple: (list of matching URLs, dict of headers from the last matching request)
+        """
+        def api_request_logged():
+            api_urls, headers = self._find_api_urls_and_headers_from_log(url_pattern=url_pattern)
+            return (api_urls, headers) if api_urls else None
         
-        return api_urls, headers
+        return self.wait_until(api_request_logged, timeout, poll_interval, name="api_request") or ([], {})
+    
+    def _get_api_json(self, url: str, headers: dict):
+        """Replay an API request and parse its JSON body. Returns None on an empty or non-JSON response."""
+        response = self.http.get(url, headers=self.http.forwardable_headers(headers))
+        return parse_json(getattr(response, "content", None))
+    
+    def _host_semaphore(self, url: str) -> threading.Semaphore:
+        host = urlparse(url).netloc
+        with self._host_semaphores_lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.Semaphore(self.per_host_limit)
+            return self._host_semaphores[host]
+    
+    def _fetch_api_urls(self, urls: list, headers: dict, return_timings=False):
+        """
+        Replay captured API URLs concurrently (bounded pool, per-host limit).
+        
+        Args:
+            urls: Captured API URLs
+            headers: Captured request headers (with cookies)
+            return_timings: Also return the per-URL timing breakdown
+            
+        Returns:
+            list: Response JSON (or None) per URL, in the order of urls;
+                  (list, timings) if return_timings. Timings are also kept in last_replay_timings.
+        """
+        timings = [None] * len(urls)
+        
+        def fetch(idx, url):
+            with self._host_semaphore(url):
+                start = time.perf_counter()
+                response_json = self._get_api_json(url, headers)
+                timings[idx] = {"url": url, "seconds": round(time.perf_counter() - start, 3), "ok": response_json is not None}
+            return response_json
+        
+        if len(urls) <= 1 or self.replay_workers <= 1:
+            results = [fetch(idx, url) for idx, url in enumerate(urls)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.replay_workers, len(urls))) as pool:
+                results = list(pool.map(fetch, range(len(urls)), urls))
+        
+        self.last_replay_timings = timings
+        return (results, timings) if return_timings else results
+    
+    def _get_browser_json(self, url: str):
+        """Read the body of a finished request the browser already made through CDP. Returns None if unavailable."""
+        captured = self.log_reader.latest(url)
+        if (captured is None or not self.log_reader.loading_state(captured.request_id)
+            or self.log_reader.response_status(captured.request_id) != 200):
+            return None
+        try:
+            response_body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": captured.request_id})
+        except Exception:
+            return None # body evicted from the browser's buffer
+        body = response_body.get("body", "")
+        return parse_json(base64.b64decode(body) if response_body.get("base64Encoded") else body)
+    
+    def _fetch_api_pages(self, urls: list, headers: dict) -> list:
+        """
+        Get the responses of captured API URLs: read from the browser via CDP where possible,
+        replay the remaining requests over HTTP.
+        
+        Returns:
+            list: Response JSON (or None) per URL, in the order of urls
+        """
+        pages = [None] * len(urls)
+        if self.cdp_bodies and urls:
+            request_ids = [captured.request_id for captured in map(self.log_reader.latest, urls) if captured]
+            def bodies_loaded(): # the body can only be read once Network.loadingFinished is logged
+                self.log_reader.poll(self.driver)
+                return all(self.log_reader.loading_state(request_id) is not None for request_id in request_ids)
+            self.wait_until(bodies_loaded, timeout=self.body_timeout, poll_interval=0.05, name="response_body")
+            pages = [self._get_browser_json(url) for url in urls]
+        missing = [idx for idx, page in enumerate(pages) if page is None]
+        if missing:
+            for idx, page in zip(missing, self._fetch_api_urls([urls[idx] for idx in missing], headers)):
+                pages[idx] = page
+        self.body_stats["cdp"] += len(urls) - len(missing)
+        self.body_stats["replayed"] += len(missing)
+        return pages
+    
+    def _endpoint_pages(self, endpoint: str, query: str, fetch, max_pages=None, stop=None) -> list:
+        """
+        Get the response pages of one endpoint call, archiving them when a capture archive is set.
+        
+        Args:
+            endpoint: Endpoint name of the archive records, e.g. "video_search"
+            query: Keyword, hashtag or URL of the call
+            fetch: Function returning the pages from the browser
+            max_pages: Pagination depth (used by ReplayScraper)
+            stop: Stop condition of the pagination (used by ReplayScraper)
+            
+        Returns:
+            list: Response JSONs, in page order
+        """
+        pages = fetch()
+        if self.capture_archive is not None:
+            self.capture_archive.write(endpoint, query, pages, **self.capture_tags)
+        return pages
     
     @staticmethod
-    def _pad_with_transparent_bg(inner_circle, outer_circle_shape):
-        """Make inner_circle's shape as same as outer_circle by filling transparent pixels"""
-        padded = np.zeros(outer_circle_shape, dtype=np.uint8)
-        center = (outer_circle_shape[1] // 2, outer_circle_shape[0] // 2)
-        h, w = inner_circle.shape[:2]
-        x, y = center[0] - w // 2, center[1] - h // 2
-        padded[y:y+h, x:x+w] = inner_circle
-        return padded
+    def _read_cursor(response_json: dict) -> tuple:
+        """Return (has_more, next_cursor) of a paginated API response."""
+        has_more = response_json.get("hasMore", response_json.get("has_more", False))
+        return bool(has_more), response_json.get("cursor")
     
     @staticmethod
-    def _compute_boundary_similarity(inner_circle, outer_circle):
-        inner_circle_height, inner_circle_width = inner_circle.shape[:2]
-        radius = min(inner_circle_height, inner_circle_width) // 2 + 1
-
-        ### enlarge the inner_circle to 102%
-        inner_circle = cv2.resize(inner_circle, 
-                                  (int(inner_circle_width * 1.02), int(inner_circle_height * 1.02)), #new size
-                                  interpolation=cv2.INTER_LINEAR)
-
-        inner_circle = TikTokScraper._pad_with_transparent_bg(inner_circle, outer_circle.shape)
-        boundary_mask = np.zeros(outer_circle.shape, dtype=np.uint8) 
-        center = (outer_circle.shape[1] // 2, outer_circle.shape[0] // 2)
-        cv2.circle(boundary_mask, center, radius, 255, 1)
-
-        inner_circle_boundary = cv2.bitwise_and(inner_circle, inner_circle, mask=boundary_mask)
-        outer_circle_boundary = cv2.bitwise_and(outer_circle, outer_circle, mask=boundary_mask)
-        diff = np.abs(inner_circle_boundary.astype(np.float32) - outer_circle_boundary.astype(np.float32))
-        return np.mean(diff)
+    def _with_cursor(url: str, cursor) -> str:
+        """Set the cursor parameter of an API URL, leaving the rest of the query string untouched."""
+        param = TikTokScraper._cursor_param(url)
+        if re.search(rf"[?&]{param}=", url):
+            return re.sub(rf"([?&]{param}=)[^&]*", lambda m: f"{m.group(1)}{cursor}", url, count=1)
+        return f"{url}{'&' if '?' in url else '?'}{param}={cursor}"
+    
+    @staticmethod
+    def _until_stop(pages: list, stop) -> tuple:
+        """
+        Cut a list of fetched pages after the first page matching the stop condition.
+        
+        Returns:
+            tuple: (pages, bool: True if a page matched before any missing (None) page)
+        """
+        for i, page in enumerate(pages):
+            if page is None:
+                break
+            if stop(page):
+                return pages[:i + 1], True
+        return pages, False
+    
+    @staticmethod
+    def _cursor_param(url: str) -> str:
+        return next((param for endpoint, param in ENDPOINT_CURSOR_PARAMS.items() if endpoint in url), "cursor")
+    
+    @classmethod
+    def _cursor_stride(cls, url: str, next_cursor):
+        """Step from the cursor of url to next_cursor when both are integers and it is positive, else None."""
+        match = re.search(rf"[?&]{cls._cursor_param(url)}=(\d+)", url)
+        try:
+            stride = int(next_cursor) - int(match.group(1))
+        except (AttributeError, TypeError, ValueError):
+            return None
+        return stride if stride > 0 else None
+    
+    def _paginate_api(self, first_url: str, headers: dict, max_pages: int, stop=None) -> tuple:
+        """
+        Fetch the following pages of a captured API request over HTTP by following its cursor.
+        
+        Pages are fetched one after another until two consecutive pages advance the
+        cursor by the same step (offset cursors: search, hashtag and user results).
+        The next pages' URLs are then known and fetched concurrently, in batches of
+        PREFETCH_BATCH so that at most a batch is requested past the last page; each
+        response is checked against the predicted cursor. Endpoints whose cursor
+        is not an offset (e.g. a profile's item_list, keyed by time) stay sequential.
+        
+        Args:
+            first_url: First captured request of the endpoint
+            headers: Captured request headers (with cookies)
+            max_pages: Maximum number of pages to fetch, including the first
+            stop: Optional function(response_json) -> bool; no page is kept after one it returns True for
+            
+        Returns:
+            tuple: (list of response JSONs, bool: False if a page came back empty while more were expected)
+        """
+        pages = []
+        url = first_url
+        last_stride = None
+        while len(pages) < max_pages:
+            response_json = self._get_api_json(url, headers)
+            if response_json is None:
+                return pages, False
+            pages.append(response_json)
+            if stop is not None and stop(response_json):
+                break
+            has_more, cursor = self._read_cursor(response_json)
+            if not has_more or cursor is None:
+                break
+            stride = self._cursor_stride(url, cursor)
+            url = self._with_cursor(url, cursor)
+            while stride is not None and stride == last_stride and len(pages) < max_pages:
+                urls = [self._with_cursor(url, int(cursor) + stride * k) for k in range(min(PREFETCH_BATCH, max_pages - len(pages)))]
+                for prefetched_url, response_json in zip(urls, self._fetch_api_urls(urls, headers)):
+                    if response_json is None:
+                        return pages, False
+                    pages.append(response_json)
+                    if stop is not None and stop(response_json):
+                        return pages, True
+                    has_more, cursor = self._read_cursor(response_json)
+                    if not has_more or cursor is None:
+                        return pages, True # no further batch is submitted
+                    url = self._with_cursor(prefetched_url, cursor)
+                    if self._cursor_stride(prefetched_url, cursor) != stride:
+                        stride = None # not an offset cursor after all: the rest of the batch is dropped
+                        break
+            last_stride = stride
+        return pages, True
+    
+    def _collect_api_pages(self, url_pattern: str, max_pages=DEFAULT_MAX_PAGES, scroll_times=3, stop=None) -> list:
+        """
+        Get the response pages of an endpoint for the page currently loaded in the browser.
+        
+        The requests already fired by the page are captured from the log; their
+        bodies are read from the browser via CDP, or replayed concurrently when
+        unavailable. Further pages are then fetched directly by cursor.
+        If that fails (e.g. the request signature no longer matches), fall back
+        to scrolling the page and replaying every captured request.
+        
+        Args:
+            url_pattern: Regex pattern of the endpoint URL
+            max_pages: Pagination depth
+            scroll_times: Scrolls of the fallback path
+            stop: Optional function(response_json) -> bool; pagination ends at the first page it returns True for
+            
+        Returns:
+            list: Response JSONs, in page order
+        """
+        urls, headers = self._wait_for_api_urls(url_pattern)
+        headers["cookie"] = self.get_tiktok_cookies_formatted()
+        if urls:
+            captured_urls = list(dict.fromkeys(urls))[:max_pages]
+            pages = self._fetch_api_pages(captured_urls, headers)
+            if stop is not None:
+                pages, stopped = self._until_stop(pages, stop)
+                if stopped:
+                    return pages
+            complete = None not in pages
+            if complete:
+                has_more, cursor = self._read_cursor(pages[-1])
+                if has_more and cursor is not None and len(pages) < max_pages:
+                    more_pages, complete = self._paginate_api(self._with_cursor(captured_urls[-1], cursor), headers, max_pages - len(pages), stop=stop)
+                    pages += more_pages
+            if complete:
+                return pages
+            print(f"Cursor pagination stopped after {len(pages)} page(s); falling back to scrolling. ({url_pattern = })")
+        
+        self.scroll_down(scroll_times)
+        more_urls, more_headers = self._find_api_urls_and_headers_from_log(url_pattern=url_pattern)
+        if more_headers:
+            headers = dict(more_headers, cookie=headers["cookie"])
+        pages = [page for page in self._fetch_api_pages(list(dict.fromkeys(urls + more_urls)), headers) if page is not None]
+        return pages if stop is None else self._until_stop(pages, stop)[0]
     
     @staticmethod
-    def rotation_match(inner_circle_img_path: str, outer_circle_img_path: str, angle_step=1):
-        ### change input imgs to gray scale
+    def rotation_match(inner_circle_img_path: str, outer_circle_img_path: str) -> float:
+        """Rotation captcha angle of two image files (see captcha_solver.solve_rotation)."""
         inner_circle = cv2.imread(inner_circle_img_path, cv2.IMREAD_UNCHANGED)
-        outer_circle = cv2.imread(outer_circle_img_path, cv2.IMREAD_UNCHANGED) 
-        inner_circle = cv2.cvtColor(inner_circle, cv2.COLOR_BGR2GRAY) if len(inner_circle.shape) == 3 else inner_circle
-        outer_circle = cv2.cvtColor(outer_circle, cv2.COLOR_BGR2GRAY) if len(outer_circle.shape) == 3 else outer_circle
-        
-        best_angle = 0
-        min_diff = 1
-        inner_circle_height, inner_circle_width = inner_circle.shape[:2]
-        inner_circle_center = (inner_circle_width // 2, inner_circle_height // 2)
-        for angle in range(0, 361, angle_step):
-            M = cv2.getRotationMatrix2D(inner_circle_center, angle, 1.0)
-            rotated_inner_circle = cv2.warpAffine(inner_circle, M, (inner_circle_width, inner_circle_height))
-            diff = TikTokScraper._compute_boundary_similarity(rotated_inner_circle, outer_circle)
-            if diff < min_diff:
-                min_diff = diff
-                best_angle = angle
-        
-        return best_angle
+        outer_circle = cv2.imread(outer_circle_img_path, cv2.IMREAD_UNCHANGED)
+        return solve_rotation(inner_circle, outer_circle)
         
+    def _sweep_blockers(self) -> dict:
+        """
+        Dismiss every known overlay in a single injected script.
+        
+        Returns:
+            dict: {"seconds", "hits": {xpath: clicks}, "captcha": number of captcha images}
+        """
+        start = time.perf_counter()
+        result = self.driver.execute_script(BLOCKER_SWEEP_JS, self.blocker_xpaths, CAPTCHA_XPATH) or {}
+        sweep = {
+                "seconds": round(time.perf_counter() - start, 3),
+                "hits": dict(zip(self.blocker_xpaths, result.get("hits", []))),
+                "captcha": int(result.get("captcha", 0))
+                }
+        self.blocker_stats["sweeps"] += 1
+        self.blocker_stats["seconds"] += sweep["seconds"]
+        self.blocker_stats["captchas"] += bool(sweep["captcha"])
+        for xpath, clicks in sweep["hits"].items():
+            self.blocker_stats["hits"][xpath] = self.blocker_stats["hits"].get(xpath, 0) + clicks
+        self.last_blocker_sweep = sweep
+        return sweep
+    
     def _remove_blockers(self) -> int:
         """
         Helper function to remove overlays that block interaction.
@@ -168,28 +480,10 @@ class TikTokScraper(WebScraper):
         Returns:
             int: Number of blocker elements that were removed
         """
-        closes_xpaths = [
-            '//span[@data-e2e="launch-popup-close"]',
-            '//button[@class="tux-base-dialog__close-button"]',
-            '//div[@role="button"][@aria-label="關閉"]',
-            '//div[contains(@class, "DivGuestModeContainer")]',
-            "//div[text()='以訪客身分繼續']",
-        ]
-        
-        removed_count = 0
-        for xpath in closes_xpaths:
-            for close in self.find_elements(By.XPATH, xpath):
-                try:
-                    close.click()
-                    removed_count += 1
-                except Exception as e:
-                    try:
-                        self.driver.execute_script("arguments[0].click();", close)
-                        removed_count += 1
-                    except Exception as e:
-                        print(f"Failed to remove blocker: {xpath = }")
-        
-        captcha_imgs = self.find_elements(By.XPATH, "//img[@alt='Captcha']")
+        sweep = self._sweep_blockers()
+        removed_count = sum(sweep["hits"].values())
+        
+        captcha_imgs = self.find_elements(By.XPATH, CAPTCHA_XPATH) if sweep["captcha"] else []
         js_script2download_blob_img = """
                                         let img = arguments[0];
                                         let canvas = document.createElement('canvas');
@@ -200,32 +494,14 @@ class TikTokScraper(WebScraper):
                                         return canvas.toDataURL('image/png').split(',')[1];  // 取得 base64 資料
                                     """
         if len(captcha_imgs) == 2:
-            ### download the outer captcha img
-            base64_data = self.driver.execute_script(js_script2download_blob_img, captcha_imgs[0])
-            image_data = base64.b64decode(base64_data)
-            outer_circle_img_path = "temp_validation_pic_out.png"
-            with open(outer_circle_img_path, "wb") as f:
-                f.write(image_data)
-            assert os.path.exists(outer_circle_img_path)
-
-            ### download the inner captcha img
-            base64_data = self.driver.execute_script(js_script2download_blob_img, captcha_imgs[1])
-            image_data = base64.b64decode(base64_data)
-            inner_circle_img_path = "temp_validation_pic_in.png"
-            with open(inner_circle_img_path, "wb") as f:
-                f.write(image_data)
-            assert os.path.exists(inner_circle_img_path)
+            ### decode the outer and inner captcha imgs in memory
+            outer_circle = decode_image(base64.b64decode(self.driver.execute_script(js_script2download_blob_img, captcha_imgs[0])))
+            inner_circle = decode_image(base64.b64decode(self.driver.execute_script(js_script2download_blob_img, captcha_imgs[1])))
 
             ###calculate the validation angle
-            validation_angle = TikTokScraper.rotation_match(inner_circle_img_path, outer_circle_img_path)
-            print(f"{validation_angle = }")
-
-            # Clean up temp CAPTCHA images
-            try:
-                os.remove(outer_circle_img_path)
-                os.remove(inner_circle_img_path)
-            except Exception as e:
-                print(f"Failed to delete temp CAPTCHA images: {e}")
+            start = time.perf_counter()
+            validation_angle = solve_rotation(inner_circle, outer_circle)
+            print(f"{validation_angle = :.1f} (solved in {(time.perf_counter() - start) * 1000:.1f} ms)")
 
             sliders = self.find_elements(By.XPATH, "//*[@draggable='true']")
             slider_tracks = self.find_elements(By.XPATH, "//*[@draggable='true']/parent::div")
@@ -250,11 +526,16 @@ class TikTokScraper(WebScraper):
                     current_pos += step
                     time.sleep(0.05) 
                 action.release().perform()
-                time.sleep(1) # wait for validation
+                self.wait_until(lambda: not self.find_elements(By.XPATH, "//*[@draggable='true']"),
+                                timeout=1, name="captcha_validation") # wait for validation
                 sliders = self.find_elements(By.XPATH, "//*[@draggable='true']")
                 slider_tracks = self.find_elements(By.XPATH, "//*[@draggable='true']/parent::div")
-                assert len(sliders) == 0 and len(slider_tracks) == 0, "Either slider_tracks nor slider is still displayed!"
+                verified = len(sliders) == 0 and len(slider_tracks) == 0
+                if self.captcha_corpus_dir:
+                    save_corpus_case(self.captcha_corpus_dir, inner_circle, outer_circle, angle=validation_angle, verified=verified)
+                assert verified, "Either slider_tracks nor slider is still displayed!"
                 removed_count += 1
+                self.invalidate_cookies() # solving the captcha renews the session cookies
             else:
                 raise Exception(f"Couldn't find slider or slider! ({len(sliders) = }, {len(slider_tracks) = })")
                       
@@ -297,60 +578,65 @@ class TikTokScraper(WebScraper):
             return result
         return wrapper
 
+    @staticmethod
+    def _post_key(item: dict) -> tuple:
+        """(createTime, video id) of an item_list item, ordered like the profile's post history."""
+        return int(item.get("createTime", 0)), int(item.get("id", 0))
+    
     @remove_blockers_before_and_after    
-    def get_profile_info(self, profile_url: str) -> dict:
+    def get_profile_info(self, profile_url: str, max_pages=11, since=None) -> dict:
         """
         Get TikTok user's profile information and video list.
         
+        With a high-water mark, pagination stops at the first page reaching a
+        video at or before the mark and only the newer videos are returned.
+        Pinned videos are listed first whatever their age, so they never stop
+        the crawl nor move the mark.
+        
         Args:
             profile_url: URL of the TikTok profile to scrape
+            max_pages: Number of item_list pages to fetch
+            since: High-water mark ({"video_id", "create_time"}) of a previous crawl, or None for a full crawl
             
         Returns:
-            dict: Profile information including user details and videos
+            dict: Profile information including user details, videos (Video records)
+                  and the high-water mark of the newest non-pinned video seen
         """
         self.navigate_to(profile_url)
         self.wait_by_xpath('//div[@id="app"]')
-        self.scroll_down(10)
         
-        urls, headers = self._find_api_urls_and_headers_from_log(url_pattern="^https://www.tiktok.com/api/post/item_list/")
-        headers["cookie"] = self.get_tiktok_cookies_formatted()
+        stop = None
+        if since:
+            since_key = (int(since["create_time"]), int(since["video_id"]))
+            stop = lambda page: any(not item.get("isPinnedItem") and self._post_key(item) <= since_key for item in page.get("itemList", []))
+        pages = self._endpoint_pages("profile", profile_url, lambda: self._collect_api_pages("^https://www.tiktok.com/api/post/item_list/", max_pages=max_pages, scroll_times=10, stop=stop),
+                                     max_pages=max_pages, stop=stop)
         
         profile = {
             "id": "", "nickname": "", "signature": "", "unique_id": "",
-            "icon_img_url": "", "author_stats": {}, "videos": []
+            "icon_img_url": "", "author_stats": {}, "videos": [], "high_water_mark": since
         }
+        newest = since_key if since else None
         
-        for i, url in enumerate(urls):
-            response = requests.get(url=url, headers=headers)
-            if not hasattr(response, "text") or not response.text:
-                continue
-                
-            response_json = json.loads(response.text)
+        for response_json in pages:
             item_list = response_json.get("itemList", [])
             if not item_list:
                 continue
             
             # Get author info from first item only
-            if i == 0:
-                author = item_list[0]["author"]
-                profile.update({
-                                "id": author["id"],
-                                "nickname": author["nickname"],
-                                "signature": author["signature"],
-                                "unique_id": author["uniqueId"],
-                                "icon_img_url": author.get("avatarLarger", ""),
-                                "author_stats": item_list[0]["authorStats"]
-                                })
+            if not profile["id"]:
+                profile.update(normalize_profile_author(item_list[0]))
+            
+            for item in item_list:
+                key = self._post_key(item)
+                if not item.get("isPinnedItem") and (newest is None or key > newest):
+                    newest = key
+                    profile["high_water_mark"] = {"video_id": item["id"], "create_time": key[0]}
+            if since:
+                item_list = [item for item in item_list if self._post_key(item) > since_key]
             
             # Add videos from all items
-            profile["videos"] += [{
-                                    "id": item["id"],
-                                    "desc": item["desc"],
-                                    "create_time": item["createTime"],
-                                    "share_link": f"{self.BASE_URL}@{profile['unique_id']}/video/{item['id']}",
-                                    "cover_img_url": item["video"].get("cover", ""),
-                                    "download_url": item["video"].get("downloadAddr") or item["video"].get("playAddr", "")
-                                    } for item in item_list] 
+            profile["videos"] += [normalize_video(item, profile["unique_id"]) for item in item_list]
         return profile
 
     @remove_blockers_before_and_after
@@ -418,70 +704,51 @@ class TikTokScraper(WebScraper):
         return post
 
     @remove_blockers_before_and_after
-    def get_user_search_results(self, keyword: str) -> list:
+    def get_user_search_results(self, keyword: str, max_pages=DEFAULT_MAX_PAGES) -> list:
         """
         Search for TikTok users by keyword.
         
         Args:
             keyword: Search term
+            max_pages: Number of result pages to fetch
             
         Returns:
             list: List of user information dictionaries
         """
         self.navigate_to(f"{self.BASE_URL}search/user?q={quote(keyword)}")
         self.wait_by_xpath('//div[@id="app"]')
-        self.scroll_down(3)
         
-        urls, headers = self._find_api_urls_and_headers_from_log(url_pattern="^https://www.tiktok.com/api/search/user/full")
-        headers["cookie"] = self.get_tiktok_cookies_formatted()
+        pages = self._endpoint_pages("user_search", keyword, lambda: self._collect_api_pages("^https://www.tiktok.com/api/search/user/full", max_pages=max_pages), max_pages=max_pages)
         
         users = []
-        for url in urls:
-            response = requests.get(url=url, headers=headers)
-            if not hasattr(response, "text") or not response.text:
-                continue
-                
-            response_json = json.loads(response.text)
+        for response_json in pages:
             try:
-                users += [{
-                            "uid": info["user_info"]["uid"],
-                            "nickname": info["user_info"]["nickname"],
-                            "signature": info["user_info"]["signature"],
-                            "unique_id": info["user_info"]["unique_id"],
-                            "follower_count": info["user_info"]["follower_count"],
-                            "icon_img_url": info["user_info"]["avatar_thumb"]["url_list"][0]
-                            } for info in response_json.get("user_list", [])]
+                users += [normalize_user(info) for info in response_json.get("user_list", [])]
             except KeyError as e:
                 print(f"\n\n\nKeyError: {e}")
                 break    
         return users
 
     @remove_blockers_before_and_after
-    def get_post_comments(self, post_url: str) -> list:
+    def get_post_comments(self, post_url: str, max_pages=DEFAULT_MAX_PAGES) -> list:
         """
         Get all comments from a TikTok post.
         
         Args:
             post_url: URL of the TikTok post
+            max_pages: Number of comment pages to fetch
             
         Returns:
             list: List of comment dictionaries containing nickname and text
         """
         self.navigate_to(post_url)
         self.wait_by_xpath('//div[@id="app"]')
-        self.scroll_down(3)
         
-        urls, headers = self._find_api_urls_and_headers_from_log(url_pattern="^https://www.tiktok.com/api/comment/list/")
-        headers["cookie"] = self.get_tiktok_cookies_formatted()
+        pages = self._endpoint_pages("comments", post_url, lambda: self._collect_api_pages("^https://www.tiktok.com/api/comment/list/", max_pages=max_pages), max_pages=max_pages)
         
         comments = []
-        for url in urls:
+        for response_json in pages:
             try:
-                response = requests.get(url=url, headers=headers)
-                if not hasattr(response, "text") or not response.text:
-                    continue
-                    
-                response_json = json.loads(response.text)
                 for comment_info in response_json.get("comments", []):
                     text = comment_info.get("text")
                     if text:
@@ -497,104 +764,54 @@ class TikTokScraper(WebScraper):
         return comments
 
     @remove_blockers_before_and_after
-    def get_video_search_results(self, keyword: str) -> list:
+    def get_video_search_results(self, keyword: str, max_pages=DEFAULT_MAX_PAGES) -> list:
         """
         Search for videos by keyword.
         
         Args:
             keyword: Search term
+            max_pages: Number of result pages to fetch
             
         Returns:
-            list: List of video information dictionaries
+            list: List of Video records (with their Author)
         """
         self.navigate_to(f"{self.BASE_URL}search/video?q={quote(keyword)}")
         self.wait_by_xpath('//div[@id="app"]')
-        self.scroll_down(3)
         
-        urls, headers = self._find_api_urls_and_headers_from_log(url_pattern="^https://www.tiktok.com/api/search/item/full")
-        headers["cookie"] = self.get_tiktok_cookies_formatted()
+        pages = self._endpoint_pages("video_search", keyword, lambda: self._collect_api_pages("^https://www.tiktok.com/api/search/item/full", max_pages=max_pages), max_pages=max_pages)
         
         videos = []
-        for url in urls:
-            response = requests.get(url=url, headers=headers)
-            if not hasattr(response, "text") or not response.text:
-                continue
-                
-            response_json = json.loads(response.text)
+        for response_json in pages:
             for item in response_json.get("item_list", []):
                 try:
-                    video_id = item["id"]
-                    author_id = item["author"]["uniqueId"]
-                    videos.append({
-                        "video": {
-                            "id": video_id,
-                            "desc": item["desc"],
-                            "create_time": item["createTime"],
-                            "share_link": f"{self.BASE_URL}@{author_id}/video/{video_id}",
-                            "cover_img_url": item["video"].get("cover", ""),
-                            "download_url": item["video"].get("downloadAddr") or item["video"].get("playAddr", "")
-                        },
-                        "author": {
-                            "id": author_id,
-                            "nickname": item["author"]["nickname"],
-                            "signature": item["author"]["signature"],
-                            "icon_img_url_L": item["author"].get("avatarLarger", ""),
-                            "icon_img_url_M": item["author"].get("avatarMedium", ""),
-                            "icon_img_url_S": item["author"].get("avatarThumb", "")
-                        }
-                    })
+                    videos.append(normalize_item(item))
                 except KeyError as e:
                     print(f"\nKeyError in video search: {e}")
                     break        
         return videos
 
     @remove_blockers_before_and_after
-    def get_hashtag_search_results(self, keyword: str) -> list:
+    def get_hashtag_search_results(self, keyword: str, max_pages=DEFAULT_MAX_PAGES) -> list:
         """
         Search for videos by hashtag.
         
         Args:
             keyword: Hashtag to search for (without #)
+            max_pages: Number of result pages to fetch
             
         Returns:
-            list: List of video information dictionaries
+            list: List of Video records (with their Author)
         """
         self.navigate_to(f"{self.BASE_URL}tag/{quote(keyword)}")
         self.wait_by_xpath('//div[@id="app"]')
-        self.scroll_down(3)
         
-        urls, headers = self._find_api_urls_and_headers_from_log(url_pattern="^https://www.tiktok.com/api/challenge/item_list")
-        headers["cookie"] = self.get_tiktok_cookies_formatted()
+        pages = self._endpoint_pages("hashtag_search", keyword, lambda: self._collect_api_pages("^https://www.tiktok.com/api/challenge/item_list", max_pages=max_pages), max_pages=max_pages)
         
         videos = []
-        for url in urls:
-            response = requests.get(url=url, headers=headers)
-            if not hasattr(response, "text") or not response.text:
-                continue
-                
-            response_json = json.loads(response.text)
+        for response_json in pages:
             for item in response_json.get("itemList", []):
                 try:
-                    video_id = item["id"]
-                    author_id = item["author"]["uniqueId"]
-                    videos.append({
-                                    "video": {
-                                                "id": video_id,
-                                                "desc": item["desc"],
-                                                "create_time": item["createTime"],
-                                                "share_link": f"{self.BASE_URL}@{author_id}/video/{video_id}",
-                                                "cover_img_url": item["video"].get("cover", ""),
-                                                "download_url": item["video"].get("downloadAddr") or item["video"].get("playAddr", "")
-                                            },
-                                    "author": {
-                                                "id": author_id,
-                                                "nickname": item["author"]["nickname"],
-                                                "signature": item["author"]["signature"],
-                                                "icon_img_url_L": item["author"].get("avatarLarger", ""),
-                                                "icon_img_url_M": item["author"].get("avatarMedium", ""),
-                                                "icon_img_url_S": item["author"].get("avatarThumb", "")
-                                            }
-                                })
+                    videos.append(normalize_item(item))
                 except KeyError as e:
                     print(f"\nKeyError in hashtag search: {e}\nItem: {item}")
                     break          
@@ -609,50 +826,97 @@ class TikTokScraper(WebScraper):
             keyword: Hashtag to search for (without #)
             
         Returns:
-            list: List of video information dictionaries
+            list: List of Video records (with their Author)
         """
-        if self.driver.current_url != "https://www.tiktok.com/foryou":
-            self.navigate_to("https://www.tiktok.com/foryou")
-            time.sleep(self.WAIT_TIME)
-        urls, headers = self._find_api_urls_and_headers_from_log(url_pattern="^https://www.tiktok.com/api/recommend/item_list")
-        headers["cookie"] = self.get_tiktok_cookies_formatted()
+        def fetch():
+            url_pattern = "^https://www.tiktok.com/api/recommend/item_list"
+            if self.driver.current_url != "https://www.tiktok.com/foryou":
+                self.navigate_to("https://www.tiktok.com/foryou")
+                urls, headers = self._wait_for_api_urls(url_pattern, timeout=self.WAIT_TIME)
+            else:
+                urls, headers = self._find_api_urls_and_headers_from_log(url_pattern=url_pattern)
+            headers["cookie"] = self.get_tiktok_cookies_formatted()
+            return [page for page in self._fetch_api_pages(urls, headers) if page is not None]
         
         videos = []
-        for url in urls:
-            response = requests.get(url=url, headers=headers)
-            if not hasattr(response, "text") or not response.text:
-                continue
-                
-            response_json = json.loads(response.text)
+        for response_json in self._endpoint_pages("recommend", "", fetch):
             for item in response_json.get("itemList", []):
                 if "liveRoomInfo" in item:
                     continue # Skip cuz live room videos has no author info
                 try:
-                    video_id = item["id"]
-                    author_id = item["author"]["uniqueId"]
-                    videos.append({
-                                    "video": {
-                                                "id": video_id,
-                                                "desc": item["desc"],
-                                                "create_time": item["createTime"],
-                                                "share_link": f"{self.BASE_URL}@{author_id}/video/{video_id}",
-                                                "cover_img_url": item["video"].get("cover", ""),
-                                                "download_url": item["video"].get("downloadAddr") or item["video"].get("playAddr", "")
-                                            },
-                                    "author": {
-                                                "id": author_id,
-                                                "nickname": item["author"]["nickname"],
-                                                "signature": item["author"]["signature"],
-                                                "icon_img_url_L": item["author"].get("avatarLarger", ""),
-                                                "icon_img_url_M": item["author"].get("avatarMedium", ""),
-                                                "icon_img_url_S": item["author"].get("avatarThumb", "")
-                                            }
-                                })
+                    videos.append(normalize_item(item))
                 except KeyError as e:
                     print(f"\nKeyError in hashtag search: {e}\nItem: {item}")
                     break        
         return videos
+
+
+class ReplayScraper(TikTokScraper):
+    """
+    TikTokScraper answering from capture archives instead of a browser.
+    
+    The getters run unchanged on the archived pages of the same endpoint and
+    query (cut to max_pages and to the stop condition, as a live crawl would
+    be), so the scout's normalize/filter/report path re-runs offline. Calls
+    that were never archived return no results.
+    
+    With live=True, a query whose video search was never archived is scraped
+    with the browser instead (and archived when a capture_path is given), so
+    only new queries cost a scrape. The scout calls select_query before each query.
+    """
     
+    def __init__(self, archives, live=False, **kwargs):
+        """
+        Args:
+            archives: Archive files, directories or glob patterns
+            live: Scrape the queries missing from the archives
+            kwargs: Keyword arguments of TikTokScraper
+        """
+        self.captures = load_captures(archives) # before the capture archive of this run is created
+        super().__init__(**kwargs)
+        self.live = live
+        self.offline = True
+        self.replay_stats = {"replayed": 0, "missing": 0, "scraped": 0}
+    
+    def select_query(self, query: str) -> bool:
+        """
+        Choose how the calls of a query are answered.
+        
+        Returns:
+            bool: True if replayed from the archives, False if scraped live
+        """
+        self.offline = not self.live or ("video_search", query) in self.captures
+        return self.offline
+    
+    def activate_webdriver(self, *args, **kwargs):
+        if not self.offline:
+            super().activate_webdriver(*args, **kwargs)
+    
+    def navigate_to(self, url: str):
+        if not self.offline:
+            super().navigate_to(url)
+    
+    def wait_by_xpath(self, *args, **kwargs):
+        if not self.offline:
+            return super().wait_by_xpath(*args, **kwargs)
+    
+    def _remove_blockers(self) -> int:
+        return 0 if self.offline else super()._remove_blockers()
+    
+    def _endpoint_pages(self, endpoint: str, query: str, fetch, max_pages=None, stop=None) -> list:
+        if not self.offline:
+            self.replay_stats["scraped"] += 1
+            return super()._endpoint_pages(endpoint, query, fetch, max_pages=max_pages, stop=stop)
+        pages = self.captures.get((endpoint, query))
+        if pages is None:
+            print(f"No archived {endpoint} pages for {query!r}.")
+            self.replay_stats["missing"] += 1
+            return []
+        self.replay_stats["replayed"] += 1
+        pages = pages[:max_pages]
+        return pages if stop is None else self._until_stop(pages, stop)[0]
+
+
 if __name__ == "__main__":
     tts = None
     try:
@@ -661,6 +925,7 @@ if __name__ == "__main__":
         tts.activate_webdriver(vm_mode=False, user_agent=user_agent)
         
         result = tts.get_profile_info("https://www.tiktok.com/@hankuoyu")
+        result["videos"] = [video.to_dict() for video in result["videos"]]
         TikTokScraper.save_json(result, 'result.json')
         print("Successfully scraped profile and saved results")
     except Exception as e:
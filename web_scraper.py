@@ -35,6 +35,7 @@ asr_history = {}
 class WebScraper:
     def __init__(self):
         self.driver = None
+        self.wait_stats = {} # wait name -> list of (seconds spent, timed out)
 
     def activate_webdriver(self, vm_mode=True, user_agent=''):
         options = webdriver.ChromeOptions()
@@ -46,6 +47,7 @@ class WebScraper:
         options.add_argument("--window-size=1920,1080") # necessary on VM
         options.add_argument('--ignore-certificate-errors')
         options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False}) # Network domain only
         if vm_mode:
             options.add_argument("--headless")
             options.add_argument("--lang=zh-TW")
@@ -88,14 +90,85 @@ class WebScraper:
             print("webdriver not found! Please activate_webdriver before.")       
             return None            
     
-    def scroll_down(self, max_scroll: int ,sleep_time=2):
+    def wait_until(self, condition, timeout: float, poll_interval=0.1, name="wait"):
+        """
+        Poll condition until it returns a truthy value or timeout expires, recording the time spent.
+        
+        Args:
+            condition: Callable without arguments
+            timeout: Ceiling in seconds
+            poll_interval: Seconds between polls
+            name: Key in wait_stats
+            
+        Returns:
+            The truthy value of condition, or None on timeout
+        """
+        start = time.perf_counter()
+        deadline = start + timeout
+        while True:
+            result = condition()
+            if result or time.perf_counter() >= deadline:
+                break
+            time.sleep(poll_interval)
+        self.wait_stats.setdefault(name, []).append((time.perf_counter() - start, not result))
+        return result or None
+    
+    def wait_summary(self) -> dict:
+        """
+        Time actually spent per wait, to tune the ceilings.
+        
+        Returns:
+            dict: {name: {"count", "timeouts", "mean", "p95", "max"}} in seconds
+        """
+        summary = {}
+        for name, samples in self.wait_stats.items():
+            seconds = sorted(spent for spent, _ in samples)
+            summary[name] = {
+                                "count": len(seconds),
+                                "timeouts": sum(timed_out for _, timed_out in samples),
+                                "mean": round(sum(seconds) / len(seconds), 3),
+                                "p95": round(seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))], 3),
+                                "max": round(seconds[-1], 3)
+                                }
+        return summary
+    
+    def wait_for_page_ready(self, timeout=10):
+        """Wait until document.readyState is 'complete'."""
+        return self.wait_until(lambda: self.driver.execute_script("return document.readyState") == "complete",
+                               timeout, name="page_ready")
+    
+    def wait_for_network_idle(self, idle_ms=500, timeout=10):
+        """Wait until no new resource has finished loading for idle_ms (Resource Timing API)."""
+        self.driver.execute_script("performance.setResourceTimingBufferSize(100000);")
+        state = {"count": -1, "since": time.perf_counter()}
+        
+        def idle():
+            count = self.driver.execute_script("return performance.getEntriesByType('resource').length")
+            if count != state["count"]:
+                state["count"], state["since"] = count, time.perf_counter()
+                return False
+            return time.perf_counter() - state["since"] >= idle_ms / 1000
+        
+        return self.wait_until(idle, timeout, poll_interval=min(0.1, idle_ms / 5000), name="network_idle")
+    
+    def scroll_down(self, max_scroll: int, timeout=2):
+        """
+        Scroll to the bottom up to max_scroll times, stopping once the page stops growing.
+        
+        Args:
+            max_scroll: Maximum number of scrolls
+            timeout: Ceiling in seconds to wait for the page height to change after each scroll
+        """
         if self.driver: 
-            last_height = 0
+            def height_changed():
+                height = self.driver.execute_script("return document.body.scrollHeight")
+                return height if height != last_height else None
+            
+            last_height = self.driver.execute_script("return document.body.scrollHeight")
             for _ in range(max_scroll):
                 self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(sleep_time)
-                new_height = self.driver.execute_script("return document.body.scrollHeight")
-                if last_height == new_height:
+                new_height = self.wait_until(height_changed, timeout, poll_interval=0.2, name="scroll_height")
+                if new_height is None:
                     break
                 last_height = new_height
         else:
@@ -139,7 +212,7 @@ class WebScraper:
                 self.driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT*2)
                 try:
                     self.navigate_to(url)
-                    time.sleep(3) #for page loading
+                    self.wait_for_page_ready(timeout=3) #for page loading
                     return self.driver.page_source
                 except Exception as e:
                     if "timeout" in str(e):
@@ -189,7 +262,7 @@ class WebScraper:
                 if self.driver is None:
                     self.activate_webdriver()
                 self.driver.get(url)
-                time.sleep(10)
+                self.wait_for_network_idle(timeout=10)
                 self.driver.save_screenshot(screenshot_filename)
                 return True
             else:
@@ -199,7 +272,7 @@ class WebScraper:
                 self.driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT*2)
                 try:
                     self.navigate_to(url)
-                    time.sleep(3) #for page loading
+                    self.wait_for_page_ready(timeout=3) #for page loading
                     self.driver.save_screenshot(screenshot_filename)
                     return True
                 except Exception as e: